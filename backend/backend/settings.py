@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
 import os
+import tempfile
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -42,6 +43,7 @@ INSTALLED_APPS = [
     'django.contrib.messages',
     'django.contrib.staticfiles',
     'rest_framework',
+    'rest_framework.authtoken',
     'corsheaders',
     'equipment',
 ]
@@ -81,12 +83,83 @@ WSGI_APPLICATION = 'backend.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# Set POSTGRES_DB (plus the usual POSTGRES_* knobs) to run on PostgreSQL; the
+# equipment ingest path picks COPY or tuned SQLite writes from the engine.
+if os.environ.get("POSTGRES_DB"):
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ["POSTGRES_DB"],
+            'USER': os.environ.get("POSTGRES_USER", ""),
+            'PASSWORD': os.environ.get("POSTGRES_PASSWORD", ""),
+            'HOST': os.environ.get("POSTGRES_HOST", ""),
+            'PORT': os.environ.get("POSTGRES_PORT", ""),
+        }
+    }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': BASE_DIR / 'db.sqlite3',
+            'OPTIONS': {
+                'init_command': (
+                    "PRAGMA journal_mode=WAL;"
+                    "PRAGMA synchronous=NORMAL;"
+                    "PRAGMA temp_store=MEMORY;"
+                    "PRAGMA cache_size=-20000;"
+                ),
+                'transaction_mode': 'IMMEDIATE',
+            },
+        }
     }
-}
+
+# Dotted path to a ``equipment.ingest.BulkWriter`` subclass; empty selects one
+# from the database engine.
+EQUIPMENT_BULK_WRITER = os.environ.get("EQUIPMENT_BULK_WRITER", "")
+
+# How many uploads are kept (older ones are pruned on upload and import).
+EQUIPMENT_HISTORY_LIMIT = int(os.environ.get("EQUIPMENT_HISTORY_LIMIT", "5"))
+
+# Dataset detail responses with more rows than this are streamed.
+EQUIPMENT_STREAM_MIN_ROWS = int(os.environ.get("EQUIPMENT_STREAM_MIN_ROWS", "5000"))
+
+# Change feed server-sent events: how often an open stream checks for new
+# events, how often it sends a keepalive, and how long before it closes (clients
+# reconnect with Last-Event-ID).
+EQUIPMENT_EVENT_POLL_SECONDS = float(os.environ.get("EQUIPMENT_EVENT_POLL_SECONDS", "1.0"))
+EQUIPMENT_EVENT_HEARTBEAT_SECONDS = float(os.environ.get("EQUIPMENT_EVENT_HEARTBEAT_SECONDS", "15"))
+EQUIPMENT_EVENT_STREAM_SECONDS = float(os.environ.get("EQUIPMENT_EVENT_STREAM_SECONDS", "300"))
+# Each open stream holds a server thread; past this many per process new
+# streams get 503 so uploads and downloads still find a free thread. Keep it
+# below the gunicorn --threads count.
+EQUIPMENT_EVENT_MAX_STREAMS = int(os.environ.get("EQUIPMENT_EVENT_MAX_STREAMS", "8"))
+# Change feed events older than this are deleted whenever history is pruned.
+EQUIPMENT_EVENT_RETENTION_DAYS = float(os.environ.get("EQUIPMENT_EVENT_RETENTION_DAYS", "7"))
+
+# Rows fetched from the database and flushed to the client per export chunk.
+EQUIPMENT_EXPORT_CHUNK_ROWS = int(os.environ.get("EQUIPMENT_EXPORT_CHUNK_ROWS", "10000"))
+
+# Upload admission control: estimated parse memory all workers on this host
+# may hold at once (0 disables it), how long an upload waits for room
+# before a 503, and the lock file the workers share the budget through.
+EQUIPMENT_UPLOAD_MEMORY_BUDGET = int(
+    os.environ.get("EQUIPMENT_UPLOAD_MEMORY_BUDGET", str(512 * 1024 * 1024))
+)
+EQUIPMENT_UPLOAD_QUEUE_SECONDS = float(os.environ.get("EQUIPMENT_UPLOAD_QUEUE_SECONDS", "10"))
+EQUIPMENT_UPLOAD_LEDGER = os.environ.get(
+    "EQUIPMENT_UPLOAD_LEDGER",
+    os.path.join(tempfile.gettempdir(), "equipment-upload-budget.json"),
+)
+
+# Compressed uploads are planned for at this many times their size until the
+# real decompressed size is known; an optional hard cap (0 = off) rejects
+# uploads that inflate further.
+EQUIPMENT_UPLOAD_COMPRESSION_RATIO = float(
+    os.environ.get("EQUIPMENT_UPLOAD_COMPRESSION_RATIO", "10")
+)
+EQUIPMENT_UPLOAD_MAX_DECOMPRESSED_BYTES = int(
+    os.environ.get("EQUIPMENT_UPLOAD_MAX_DECOMPRESSED_BYTES", "0")
+)
 
 
 # Password validation
@@ -139,9 +212,14 @@ STORAGES = {
 }
 
 REST_FRAMEWORK = {
+    "DEFAULT_RENDERER_CLASSES": [
+        "equipment.renderers.FastJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
     "DEFAULT_AUTHENTICATION_CLASSES": [
-        "rest_framework.authentication.BasicAuthentication",
+        "rest_framework.authentication.TokenAuthentication",
         "rest_framework.authentication.SessionAuthentication",
+        "rest_framework.authentication.BasicAuthentication",
     ],
     "DEFAULT_PERMISSION_CLASSES": [
         "rest_framework.permissions.IsAuthenticated",
@@ -0,0 +1,212 @@
+from __future__ import annotations
+
+import json
+import math
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
+
+from django.conf import settings
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+# Parsed footprint of one CSV row in the five-column layout: three float64
+# cells, two object cells pointing at str objects (~50 bytes of header each),
+# and the per-row Python ints/floats/list slots built by
+# ``ParsedDataset.record_rows`` on the way to the bulk writer.
+ROW_OVERHEAD_BYTES = 3 * 8 + 2 * (8 + 50) + 6 * 8 + 3 * 24 + 28
+# A typical row ("Pump-12,Pump,120.5,5.21,110.3") is ~30-40 bytes of text.
+ESTIMATED_ROW_BYTES = 32
+# Text is held twice (the raw upload and the parsed str objects).
+TEXT_COPIES = 2
+
+_thread_lock = threading.Lock()
+_local_ledger: Dict[str, Dict] = {}
+
+
+class UploadTooLarge(Exception):
+    """The upload alone exceeds the memory budget and can never be admitted."""
+
+
+class UploadBudgetExhausted(Exception):
+    """The budget stayed full for the whole queueing window."""
+
+    def __init__(self, retry_after: int):
+        super().__init__("Server is busy processing other uploads; retry later.")
+        self.retry_after = retry_after
+
+
+def estimate_upload_bytes(content_length: int) -> int:
+    """
+    Peak memory needed to parse and ingest an upload of ``content_length``
+    bytes, from the known column layout.
+    """
+
+    rows = math.ceil(content_length / ESTIMATED_ROW_BYTES)
+    return content_length * TEXT_COPIES + rows * ROW_OVERHEAD_BYTES
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+@contextmanager
+def _locked_ledger() -> Iterator[Dict[str, Dict]]:
+    """
+    The in-flight reservations shared by every worker on this host, held
+    under an exclusive ``flock`` on ``EQUIPMENT_UPLOAD_LEDGER``. Without
+    ``fcntl`` the ledger is per process.
+    """
+
+    with _thread_lock:
+        if fcntl is None:  # pragma: no cover - Windows
+            yield _local_ledger
+            return
+        path = settings.EQUIPMENT_UPLOAD_LEDGER
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        with os.fdopen(fd, "r+") as handle:
+            fcntl.flock(handle, fcntl.LOCK_EX)
+            try:
+                content = handle.read()
+                ledger = json.loads(content) if content else {}
+                # Drop reservations left behind by workers that died mid-upload.
+                ledger = {
+                    token: entry for token, entry in ledger.items() if _pid_alive(entry["pid"])
+                }
+                yield ledger
+                handle.seek(0)
+                handle.truncate()
+                handle.write(json.dumps(ledger))
+                handle.flush()
+            finally:
+                fcntl.flock(handle, fcntl.LOCK_UN)
+
+
+def _try_reserve(cost: int, budget: int, token: Optional[str] = None) -> Optional[str]:
+    """
+    Set the reservation under ``token`` (a new one when ``None``) to ``cost``
+    bytes if that fits. Returns the token, or ``None`` when there is no room
+    yet.
+
+    Only one growing reservation may wait at a time: two inflating uploads
+    could otherwise each hold what the other needs until both time out, so
+    the second one is turned away at once.
+    """
+
+    with _locked_ledger() as ledger:
+        held = ledger[token]["bytes"] if token in ledger else 0
+        in_flight = sum(entry["bytes"] for entry in ledger.values()) - held
+        if in_flight + cost <= budget:
+            token = token or uuid.uuid4().hex
+            ledger[token] = {"bytes": cost, "pid": os.getpid()}
+            return token
+        if token in ledger:
+            if any(entry.get("growing") for key, entry in ledger.items() if key != token):
+                raise UploadBudgetExhausted(retry_after=1)
+            ledger[token]["growing"] = True
+        return None
+
+
+def _release(token: str) -> None:
+    with _locked_ledger() as ledger:
+        ledger.pop(token, None)
+
+
+def in_flight_bytes() -> int:
+    with _locked_ledger() as ledger:
+        return sum(entry["bytes"] for entry in ledger.values())
+
+
+def _wait_for_room(
+    cost: int, budget: int, queue_seconds: float, token: Optional[str] = None
+) -> str:
+    deadline = time.monotonic() + queue_seconds
+    delay = 0.05
+    reserved = _try_reserve(cost, budget, token)
+    while reserved is None:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise UploadBudgetExhausted(retry_after=max(1, math.ceil(queue_seconds)))
+        time.sleep(min(delay, remaining))
+        delay = min(delay * 2, 0.5)
+        reserved = _try_reserve(cost, budget, token)
+    return reserved
+
+
+class UploadReservation:
+    """
+    The share of the budget one upload holds, as a single ledger entry. It
+    grows when the CSV turns out larger than first planned (e.g. a compressed
+    upload that inflates more than expected), doubling each time so a long
+    upload touches the ledger a handful of times rather than once per read.
+    """
+
+    def __init__(self, budget: int, queue_seconds: float):
+        self.budget = budget
+        self.queue_seconds = queue_seconds
+        self.covered_length = 0
+        self.cost = 0
+        self._token: Optional[str] = None
+
+    def cover(self, content_length: int) -> None:
+        """
+        Make sure parsing ``content_length`` bytes of CSV is accounted for,
+        queueing for the difference if needed.
+        """
+
+        if content_length <= self.covered_length:
+            return
+        needed = estimate_upload_bytes(content_length)
+        if self.budget and needed > self.budget:
+            raise UploadTooLarge(
+                f"Upload needs an estimated {needed // 2**20} MiB to process; "
+                f"the server allows {self.budget // 2**20} MiB."
+            )
+        length = max(content_length, self.covered_length * 2)
+        cost = estimate_upload_bytes(length)
+        if self.budget and cost > self.budget:
+            # The next doubling would not fit; hold the whole budget instead.
+            length, cost = content_length, self.budget
+        if self.budget and cost > self.cost:
+            self._token = _wait_for_room(cost, self.budget, self.queue_seconds, self._token)
+        self.covered_length = length
+        self.cost = cost
+
+    def release(self) -> None:
+        if self._token is not None:
+            _release(self._token)
+            self._token = None
+
+
+@contextmanager
+def admit_upload(content_length: int) -> Iterator[UploadReservation]:
+    """
+    Hold a share of ``EQUIPMENT_UPLOAD_MEMORY_BUDGET`` while an upload is
+    parsed and written.
+
+    Waits up to ``EQUIPMENT_UPLOAD_QUEUE_SECONDS`` for room before raising
+    ``UploadBudgetExhausted``; raises ``UploadTooLarge`` straight away when
+    the upload could not fit even on an idle server. A budget of 0 turns
+    admission control off.
+    """
+
+    reservation = UploadReservation(
+        settings.EQUIPMENT_UPLOAD_MEMORY_BUDGET, settings.EQUIPMENT_UPLOAD_QUEUE_SECONDS
+    )
+    try:
+        reservation.cover(content_length)
+        yield reservation
+    finally:
+        reservation.release()
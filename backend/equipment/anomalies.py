@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+from typing import Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+METRICS = ("flowrate", "pressure", "temperature")
+
+# Modified z-score cut-off from Iglewicz & Hoaglin; 0.6745 scales the MAD to a
+# standard deviation for normally distributed readings.
+ROBUST_Z_THRESHOLD = 3.5
+MAD_SCALE = 0.6745
+IQR_FACTOR = 1.5
+# Types with fewer readings than this are too small to judge.
+MIN_GROUP_SIZE = 5
+# Floor for MAD and IQR as a fraction of the group median, so near-constant
+# groups do not flag every reading that differs in the last digit.
+RELATIVE_SPREAD_FLOOR = 0.01
+
+
+def detect_anomalies(df: pd.DataFrame, lookup: Dict[str, str]) -> List[Tuple]:
+    """
+    Flag readings that sit outside the normal range for their equipment type.
+
+    A reading is an outlier when its robust z-score exceeds
+    ``ROBUST_Z_THRESHOLD`` and it also falls outside the Tukey fences
+    (``IQR_FACTOR`` x IQR beyond the quartiles). Every statistic comes from one
+    grouped pass over the three numeric columns.
+
+    Returns ``(row_index, equipment_name, equipment_type, metric, value,
+    score)`` tuples; ``score`` is the robust z-score, or ``None`` when the
+    group has no spread at all (MAD and median both zero). Such groups flag
+    any reading outside the fences.
+    """
+
+    columns = [lookup[metric] for metric in METRICS]
+    values = df[columns].astype(float).set_axis(list(METRICS), axis=1).reset_index(drop=True)
+    types = df[lookup["type"]].fillna("").astype(str).reset_index(drop=True)
+    names = df[lookup["equipment name"]].fillna("").astype(str).reset_index(drop=True)
+
+    grouped = values.groupby(types)
+    median = grouped.transform("median")
+    q1 = grouped.transform("quantile", 0.25)
+    q3 = grouped.transform("quantile", 0.75)
+    deviation = values - median
+    floor = RELATIVE_SPREAD_FLOOR * median.abs()
+    mad = np.maximum(deviation.abs().groupby(types).transform("median"), floor)
+    group_size = types.groupby(types).transform("size")
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        score = (MAD_SCALE * deviation / mad).where(mad > 0)
+    spread = IQR_FACTOR * np.maximum(q3 - q1, floor)
+    outside_fences = (values < q1 - spread) | (values > q3 + spread)
+    # Without any spread (MAD and median both zero) every reading that differs
+    # from the median is infinitely far out; the fences alone decide.
+    far_out = (score.abs() > ROBUST_Z_THRESHOLD) | ((mad == 0) & (deviation != 0))
+    flagged = far_out & outside_fences
+    flagged.loc[group_size < MIN_GROUP_SIZE] = False
+
+    rows, metrics = np.nonzero(flagged.to_numpy())
+    score_array = score.to_numpy()
+    value_array = values.to_numpy()
+    return [
+        (
+            int(row),
+            names.iat[row],
+            types.iat[row],
+            METRICS[metric],
+            float(value_array[row, metric]),
+            None if np.isnan(score_array[row, metric]) else round(float(score_array[row, metric]), 3),
+        )
+        for row, metric in zip(rows, metrics)
+    ]
@@ -0,0 +1,126 @@
+from __future__ import annotations
+
+from typing import Dict, List
+
+COLUMNAR_MEDIA_TYPE = "application/vnd.equipment.columnar+json"
+ARROW_STREAM_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+
+# Fields sent as dictionary-encoded columns (few distinct values per dataset).
+DICTIONARY_FIELDS = {"equipment_type"}
+STRING_FIELDS = {"equipment_name", "equipment_type"}
+
+
+def arrow_available() -> bool:
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def dataset_columns(dataset, offset: int = 0, limit: int | None = None) -> Dict:
+    """
+    Read a dataset's rows column by column in one pass.
+
+    Returns ``{"length", "columns", "fields", "integers", "values"}`` where
+    ``values`` maps each CSV header to a plain list, except dictionary fields
+    which come back as ``{"dictionary": [...], "indices": [...]}``. Extra CSV
+    columns have a ``None`` field.
+    """
+
+    pairs = dataset.record_fields()
+    headers = [header for header, _ in pairs]
+    fields = [field for _, field in pairs]
+    records = dataset.records.order_by("row_index")
+    if limit is not None:
+        records = records[offset : offset + limit]
+    elif offset:
+        records = records[offset:]
+
+    columns: List[list] = [[] for _ in fields]
+    dictionaries: Dict[int, Dict[str, int]] = {
+        position: {} for position, field in enumerate(fields) if field in DICTIONARY_FIELDS
+    }
+    length = 0
+    for row in dataset.iter_values(pairs, records, chunk_size=5000):
+        length += 1
+        for position, value in enumerate(row):
+            dictionary = dictionaries.get(position)
+            if dictionary is not None:
+                value = dictionary.setdefault(value, len(dictionary))
+            columns[position].append(value)
+
+    integer_columns = set(dataset.integer_columns)
+    values = {}
+    for position, header in enumerate(headers):
+        if position in dictionaries:
+            values[header] = {
+                "dictionary": list(dictionaries[position]),
+                "indices": columns[position],
+            }
+        else:
+            values[header] = columns[position]
+    return {
+        "length": length,
+        "columns": headers,
+        "fields": fields,
+        "integers": [header for header in headers if header in integer_columns],
+        "values": values,
+    }
+
+
+def columnar_payload(columns: Dict) -> Dict:
+    """
+    The JSON wire shape: drop the internal ``fields``/``integers`` lists.
+    """
+
+    return {key: columns[key] for key in ("length", "columns", "values")}
+
+
+def columns_to_rows(columns: Dict) -> List[Dict]:
+    """
+    Back to the row-per-object shape used by plain JSON responses.
+    """
+
+    headers = columns["columns"]
+    decoded = []
+    for header in headers:
+        value = columns["values"][header]
+        if isinstance(value, dict):
+            dictionary = value["dictionary"]
+            value = [dictionary[index] for index in value["indices"]]
+        decoded.append(value)
+    return [dict(zip(headers, row)) for row in zip(*decoded)]
+
+
+def _extra_array(pa, values: list):
+    # Extra columns keep whatever types pandas parsed; mixed columns become strings.
+    try:
+        return pa.array(values)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        return pa.array([None if value is None else str(value) for value in values], pa.string())
+
+
+def to_arrow_table(columns: Dict, metadata: Dict[str, bytes] | None = None):
+    import pyarrow as pa
+
+    integers = set(columns.get("integers", ()))
+    arrays = []
+    for header, field in zip(columns["columns"], columns["fields"]):
+        value = columns["values"][header]
+        if field is None:
+            arrays.append(_extra_array(pa, value))
+        elif field in DICTIONARY_FIELDS:
+            arrays.append(
+                pa.DictionaryArray.from_arrays(
+                    pa.array(value["indices"], type=pa.int32()),
+                    pa.array(value["dictionary"], type=pa.string()),
+                )
+            )
+        elif field in STRING_FIELDS:
+            arrays.append(pa.array(value, type=pa.string()))
+        elif header in integers:
+            arrays.append(pa.array(value, type=pa.int64()))
+        else:
+            arrays.append(pa.array(value, type=pa.float64()))
+    return pa.Table.from_arrays(arrays, names=columns["columns"], metadata=metadata)
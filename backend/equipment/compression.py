@@ -0,0 +1,144 @@
+from __future__ import annotations
+
+import gzip
+import io
+import zipfile
+from typing import Callable, Optional
+
+from django.conf import settings
+
+COMPRESSION_SUFFIXES = {".gz": "gzip", ".zst": "zstd", ".zip": "zip"}
+CONTENT_ENCODINGS = {"identity": None, "gzip": "gzip", "x-gzip": "gzip", "zstd": "zstd"}
+MAGIC_NUMBERS = ((b"\x1f\x8b", "gzip"), (b"\x28\xb5\x2f\xfd", "zstd"), (b"PK\x03\x04", "zip"))
+
+
+class UnsupportedCompression(ValueError):
+    pass
+
+
+def zstd_available() -> bool:
+    try:
+        import zstandard  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def compression_from_encoding(header: str) -> Optional[str]:
+    """
+    Map a request ``Content-Encoding`` onto a compression name (``None`` for
+    plain bodies). Only a single coding is accepted.
+    """
+
+    encoding = header.strip().lower()
+    if not encoding:
+        return None
+    if encoding not in CONTENT_ENCODINGS:
+        raise UnsupportedCompression(f"Unsupported Content-Encoding: {header}")
+    return CONTENT_ENCODINGS[encoding]
+
+
+def compression_from_name(name: str) -> Optional[str]:
+    for suffix, compression in COMPRESSION_SUFFIXES.items():
+        if name.lower().endswith(suffix):
+            return compression
+    return None
+
+
+def sniff_compression(fileobj) -> Optional[str]:
+    """
+    Detect compression from the magic number of a seekable upload.
+    """
+
+    head = fileobj.read(4)
+    fileobj.seek(0)
+    for magic, compression in MAGIC_NUMBERS:
+        if head.startswith(magic):
+            return compression
+    return None
+
+
+def csv_file_name(name: str) -> str:
+    """
+    ``readings.csv.gz`` -> ``readings.csv``; archives without an inner
+    extension get ``.csv``.
+    """
+
+    compression = compression_from_name(name)
+    if compression is None:
+        return name
+    stem = name.rsplit(".", 1)[0]
+    return stem if stem.lower().endswith(".csv") else f"{stem}.csv"
+
+
+def expected_csv_bytes(size: int, compression: Optional[str]) -> int:
+    """
+    Decompressed size to plan for before decompression starts, from
+    ``EQUIPMENT_UPLOAD_COMPRESSION_RATIO`` and capped by
+    ``EQUIPMENT_UPLOAD_MAX_DECOMPRESSED_BYTES``.
+    """
+
+    if compression is None:
+        return size
+    expected = int(size * settings.EQUIPMENT_UPLOAD_COMPRESSION_RATIO)
+    limit = settings.EQUIPMENT_UPLOAD_MAX_DECOMPRESSED_BYTES
+    return min(expected, limit) if limit else expected
+
+
+class MeteredReader(io.RawIOBase):
+    """
+    Passes decompressed bytes through to the CSV parser and reports the
+    running total to ``on_read``, which may raise to abort the parse.
+    """
+
+    def __init__(self, stream, on_read: Optional[Callable[[int], None]] = None):
+        self._stream = stream
+        self._on_read = on_read
+        self.bytes_read = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        chunk = self._stream.read(len(buffer))
+        size = len(chunk)
+        buffer[:size] = chunk
+        if size:
+            self.bytes_read += size
+            if self._on_read is not None:
+                self._on_read(self.bytes_read)
+        return size
+
+    def close(self) -> None:
+        self._stream.close()
+        super().close()
+
+
+def _open_decompressed(fileobj, compression: Optional[str]):
+    if compression is None:
+        return fileobj
+    if compression == "gzip":
+        return gzip.GzipFile(fileobj=fileobj, mode="rb")
+    if compression == "zstd":
+        if not zstd_available():
+            raise UnsupportedCompression("zstd uploads need the zstandard package on the server.")
+        import zstandard
+
+        return zstandard.ZstdDecompressor().stream_reader(fileobj)
+    if compression == "zip":
+        archive = zipfile.ZipFile(fileobj)
+        entries = [entry for entry in archive.infolist() if not entry.is_dir()]
+        if len(entries) != 1:
+            raise ValueError("ZIP uploads must contain exactly one CSV file.")
+        return archive.open(entries[0])
+    raise UnsupportedCompression(f"Unsupported compression: {compression}")
+
+
+def open_csv(fileobj, compression: Optional[str], on_read=None) -> io.BufferedReader:
+    """
+    A binary stream of CSV text that decompresses ``fileobj`` as it is read,
+    so neither the compressed nor the decompressed file is held in memory.
+    ZIP archives need a seekable ``fileobj``.
+    """
+
+    return io.BufferedReader(MeteredReader(_open_decompressed(fileobj, compression), on_read))
@@ -0,0 +1,168 @@
+from __future__ import annotations
+
+import threading
+import time
+from datetime import timedelta
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.utils import timezone
+
+from .models import DatasetEvent
+from .renderers import dumps
+from .serializers import DatasetEventSerializer, EquipmentDatasetSerializer
+
+
+def _publish(events: List[DatasetEvent]) -> None:
+    """
+    Insert ``events`` so their ids become visible in id order.
+
+    On PostgreSQL an id is taken when the row is inserted but only seen when
+    the transaction commits, so a long upload could commit id N after a
+    client already moved its cursor past N + 1. There the insert waits for
+    the surrounding transaction to commit and then runs in a short one of its
+    own that holds a self-conflicting table lock, one publisher at a time.
+    SQLite already serializes writers, so events are written in place.
+    """
+
+    connection = connections[DatasetEvent.objects.db]
+    if connection.vendor != "postgresql":
+        DatasetEvent.objects.bulk_create(events)
+        return
+
+    def publish():
+        table = connection.ops.quote_name(DatasetEvent._meta.db_table)
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                cursor.execute(f"LOCK TABLE {table} IN SHARE ROW EXCLUSIVE MODE")
+            DatasetEvent.objects.bulk_create(events)
+
+    transaction.on_commit(publish)
+
+
+def record_event(kind: str, dataset_id=None, payload: Optional[Dict] = None) -> DatasetEvent:
+    event = DatasetEvent(kind=kind, dataset_id=dataset_id, payload=payload or {})
+    _publish([event])
+    return event
+
+
+def record_dataset_created(dataset) -> DatasetEvent:
+    return record_event(
+        DatasetEvent.DATASET_CREATED,
+        dataset_id=dataset.pk,
+        payload=dict(EquipmentDatasetSerializer(dataset).data),
+    )
+
+
+def record_datasets_pruned(dataset_ids: Iterable) -> None:
+    _publish(
+        [
+            DatasetEvent(kind=DatasetEvent.DATASET_PRUNED, dataset_id=dataset_id, payload={})
+            for dataset_id in dataset_ids
+        ]
+    )
+
+
+def prune_events() -> int:
+    """
+    Delete events older than ``EQUIPMENT_EVENT_RETENTION_DAYS``. A client
+    offline for longer reloads instead of replaying the feed.
+    """
+
+    cutoff = timezone.now() - timedelta(days=settings.EQUIPMENT_EVENT_RETENTION_DAYS)
+    deleted, _ = DatasetEvent.objects.filter(created_at__lt=cutoff).delete()
+    return deleted
+
+
+def current_cursor() -> int:
+    return DatasetEvent.objects.order_by("-id").values_list("id", flat=True).first() or 0
+
+
+def events_since(cursor: int, limit: int) -> List[DatasetEvent]:
+    return list(DatasetEvent.objects.filter(id__gt=cursor).order_by("id")[:limit])
+
+
+def format_sse(event: DatasetEvent) -> bytes:
+    data = dumps(DatasetEventSerializer(event).data)
+    return b"id: %d\nevent: %s\ndata: %s\n\n" % (event.pk, event.kind.encode(), data)
+
+
+def _release_connections() -> None:
+    for connection in connections.all(initialized_only=True):
+        if not connection.in_atomic_block:
+            connection.close()
+
+
+def stream_events(cursor: int) -> Iterator[bytes]:
+    """
+    Server-sent events after ``cursor``.
+
+    Waiting costs one primary-key probe per ``EQUIPMENT_EVENT_POLL_SECONDS``
+    on a database connection kept for the whole stream, so idle streams do
+    not reconnect on every tick; ``EventStream`` bounds how many are held.
+    The stream closes after ``EQUIPMENT_EVENT_STREAM_SECONDS`` so a server
+    thread is not pinned forever; ``EventSource`` reconnects with
+    ``Last-Event-ID`` and resumes where it left off.
+    """
+
+    poll = settings.EQUIPMENT_EVENT_POLL_SECONDS
+    heartbeat = settings.EQUIPMENT_EVENT_HEARTBEAT_SECONDS
+    deadline = time.monotonic() + settings.EQUIPMENT_EVENT_STREAM_SECONDS
+    last_sent = time.monotonic()
+    yield b"retry: %d\n\n" % int(poll * 1000 * 2)
+    try:
+        while True:
+            events = events_since(cursor, 100)
+            for event in events:
+                cursor = event.pk
+                yield format_sse(event)
+            now = time.monotonic()
+            if events:
+                last_sent = now
+            elif now - last_sent >= heartbeat:
+                last_sent = now
+                yield b": keepalive\n\n"
+            if now >= deadline:
+                return
+            if not events:
+                time.sleep(poll)
+    finally:
+        _release_connections()
+
+
+class EventStream:
+    """
+    ``stream_events`` holding one of the ``EQUIPMENT_EVENT_MAX_STREAMS``
+    stream slots of this process until the response is closed. Streams are
+    long-lived, so the cap keeps threads free for uploads and downloads.
+    """
+
+    _open = 0
+    _lock = threading.Lock()
+
+    def __init__(self, cursor: int):
+        self._events = stream_events(cursor)
+        self._closed = False
+
+    @classmethod
+    def open(cls, cursor: int) -> Optional["EventStream"]:
+        """
+        A stream from ``cursor``, or ``None`` when every slot is taken.
+        """
+
+        with cls._lock:
+            if cls._open >= settings.EQUIPMENT_EVENT_MAX_STREAMS:
+                return None
+            cls._open += 1
+        return cls(cursor)
+
+    def __iter__(self) -> Iterator[bytes]:
+        return self._events
+
+    def close(self) -> None:
+        self._events.close()
+        with self._lock:
+            if not self._closed:
+                self._closed = True
+                EventStream._open -= 1
@@ -0,0 +1,148 @@
+from __future__ import annotations
+
+import csv
+import io
+from typing import Iterable, Iterator, List, Sequence, Tuple
+
+from .models import COLUMN_FIELDS
+from .renderers import dumps
+
+EXPORT_FORMATS = {
+    "csv": ("text/csv", "csv"),
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+
+
+def resolve_columns(dataset, requested: Sequence[str]) -> List[Tuple[str, str]]:
+    """
+    Map requested header names onto ``(header, field)`` pairs, keeping the
+    dataset's column order when no projection is given. Extra CSV columns
+    pair with ``None``.
+    """
+
+    pairs = dataset.record_fields()
+    if not requested:
+        return pairs
+    by_key = {header.strip().lower(): (header, field) for header, field in pairs}
+    selected = []
+    for name in requested:
+        key = name.strip().lower()
+        if key not in COLUMN_FIELDS and key not in by_key:
+            raise ValueError(f"Unknown column: {name}")
+        if key in by_key and by_key[key] not in selected:
+            selected.append(by_key[key])
+    return selected
+
+
+def export_rows(dataset, pairs: Sequence[Tuple[str, str]], types: Sequence[str], chunk_size: int):
+    """
+    Iterate value tuples for ``pairs`` straight off the records table.
+    """
+
+    queryset = dataset.records.order_by("row_index")
+    if types:
+        queryset = queryset.filter(equipment_type__in=types)
+    return dataset.iter_values(pairs, queryset, chunk_size=chunk_size)
+
+
+def _chunks(rows: Iterable[tuple], size: int) -> Iterator[List[tuple]]:
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def iter_csv(headers: Sequence[str], rows: Iterable[tuple], chunk_size: int) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerow(headers)
+    for chunk in _chunks(rows, chunk_size):
+        writer.writerows(chunk)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+def iter_ndjson(headers: Sequence[str], rows: Iterable[tuple], chunk_size: int) -> Iterator[bytes]:
+    for chunk in _chunks(rows, chunk_size):
+        yield b"".join(dumps(dict(zip(headers, row))) + b"\n" for row in chunk)
+
+
+class _DrainableSink(io.RawIOBase):
+    """
+    Write-only file that hands back whatever was written since the last drain.
+    """
+
+    def __init__(self):
+        self._buffer = bytearray()
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._buffer.extend(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self) -> bytes:
+        data = bytes(self._buffer)
+        self._buffer.clear()
+        return data
+
+
+def iter_parquet(
+    headers: Sequence[str],
+    fields: Sequence[str],
+    rows: Iterable[tuple],
+    chunk_size: int,
+    integers: Sequence[str] = (),
+) -> Iterator[bytes]:
+    """
+    Write one Parquet row group per chunk and flush it to the client.
+
+    Extra CSV columns (``None`` field) are written as strings, since their
+    type is not known before the first chunk.
+    """
+
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    string_fields = {"equipment_name", "equipment_type"}
+
+    def column_type(header, field):
+        if field is None or field in string_fields:
+            return pa.string()
+        return pa.int64() if header in integers else pa.float64()
+
+    schema = pa.schema([(header, column_type(header, field)) for header, field in zip(headers, fields)])
+    extra_positions = [position for position, field in enumerate(fields) if field is None]
+    sink = _DrainableSink()
+    with pq.ParquetWriter(sink, schema) as writer:
+        for chunk in _chunks(rows, chunk_size):
+            columns = [list(column) for column in zip(*chunk)]
+            for position in extra_positions:
+                columns[position] = [
+                    None if value is None else str(value) for value in columns[position]
+                ]
+            writer.write_batch(pa.record_batch(columns, schema=schema))
+            yield sink.drain()
+    yield sink.drain()
+
+
+def parquet_available() -> bool:
+    try:
+        import pyarrow.parquet  # noqa: F401
+    except ImportError:
+        return False
+    return True
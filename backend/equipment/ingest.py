@@ -0,0 +1,264 @@
+from __future__ import annotations
+
+import io
+import json
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Sequence, Tuple
+
+from django.conf import settings
+from django.db import connections, models, transaction
+from django.utils.module_loading import import_string
+
+from .events import prune_events, record_dataset_created, record_datasets_pruned
+from .models import EquipmentAnomaly, EquipmentDataset, EquipmentRecord
+from .search import index_records
+
+ANOMALY_FIELDS = (
+    "row_index",
+    "equipment_name",
+    "equipment_type",
+    "metric",
+    "value",
+    "score",
+)
+
+RECORD_FIELDS = (
+    "row_index",
+    "equipment_name",
+    "equipment_type",
+    "flowrate",
+    "pressure",
+    "temperature",
+    "extra",
+)
+
+
+def _batched(rows: Iterable[Sequence], size: int) -> Iterator[List[Sequence]]:
+    iterator = iter(rows)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+class BulkWriter:
+    """
+    Writes many rows of a single model in as few round trips as possible.
+
+    ``rows`` are tuples ordered like ``fields``; ``extra`` holds constant
+    column values (usually the parent foreign key) appended to every row.
+    Subclasses implement ``write_batch``, which receives the model fields and
+    rows whose values already went through ``prepare_value``.
+    """
+
+    batch_size = 5000
+
+    def __init__(self, using: str = "default"):
+        self.using = using
+        self.connection = connections[using]
+
+    def prepare_value(self, field, value):
+        """
+        Database representation of ``value``. Only applied to JSON fields and
+        to ``extra`` constants; plain columns are passed through as they are.
+        """
+
+        if isinstance(field, models.JSONField):
+            return json.dumps(value, cls=field.encoder)
+        return field.get_db_prep_value(value, self.connection)
+
+    def write(
+        self,
+        model,
+        fields: Sequence[str],
+        rows: Iterable[Sequence],
+        extra: Dict[str, object] | None = None,
+    ) -> int:
+        extra = extra or {}
+        model_fields = [model._meta.get_field(name) for name in (*fields, *extra)]
+        constants = tuple(
+            self.prepare_value(field, value)
+            for field, value in zip(model_fields[len(fields) :], extra.values())
+        )
+        json_fields = [
+            (position, field)
+            for position, field in enumerate(model_fields[: len(fields)])
+            if isinstance(field, models.JSONField)
+        ]
+        written = 0
+        with transaction.atomic(using=self.using):
+            for batch in _batched(rows, self.batch_size):
+                if json_fields:
+                    batch = [self._prepare_json(row, json_fields) for row in batch]
+                self.write_batch(model, model_fields, [(*row, *constants) for row in batch])
+                written += len(batch)
+        return written
+
+    def _prepare_json(self, row: Sequence, json_fields) -> Tuple:
+        row = list(row)
+        for position, field in json_fields:
+            row[position] = self.prepare_value(field, row[position])
+        return tuple(row)
+
+    def write_batch(self, model, fields: List, batch: List[Tuple]) -> None:
+        raise NotImplementedError
+
+
+class ORMBulkWriter(BulkWriter):
+    """
+    Portable fallback built on ``bulk_create``.
+    """
+
+    def prepare_value(self, field, value):
+        return value
+
+    def write_batch(self, model, fields, batch):
+        names = [field.attname for field in fields]
+        model.objects.using(self.using).bulk_create([model(**dict(zip(names, row))) for row in batch])
+
+
+class SQLiteBulkWriter(BulkWriter):
+    """
+    Batched ``executemany`` inside one transaction.
+
+    Connection level pragmas (WAL journal, ``synchronous=NORMAL``) are set via
+    ``DATABASES['default']['OPTIONS']['init_command']``.
+    """
+
+    def write_batch(self, model, fields, batch):
+        quote = self.connection.ops.quote_name
+        sql = "INSERT INTO {} ({}) VALUES ({})".format(
+            quote(model._meta.db_table),
+            ", ".join(quote(field.column) for field in fields),
+            ", ".join(["%s"] * len(fields)),
+        )
+        with self.connection.cursor() as cursor:
+            cursor.executemany(sql, batch)
+
+
+def _copy_text(value) -> str:
+    # COPY text format: \N is NULL, so empty strings stay empty strings.
+    if value is None:
+        return "\\N"
+    return (
+        str(value)
+        .replace("\\", "\\\\")
+        .replace("\t", "\\t")
+        .replace("\n", "\\n")
+        .replace("\r", "\\r")
+    )
+
+
+def copy_text_rows(batch: Iterable[Sequence]) -> str:
+    """
+    Encode rows for ``COPY ... FROM STDIN`` in the default text format.
+    """
+
+    return "".join("\t".join(_copy_text(value) for value in row) + "\n" for row in batch)
+
+
+class PostgresCopyWriter(BulkWriter):
+    """
+    Streams rows with ``COPY ... FROM STDIN`` (psycopg 3 row by row, or
+    psycopg2 as one text-format buffer per batch).
+    """
+
+    def write_batch(self, model, fields, batch):
+        quote = self.connection.ops.quote_name
+        target = "{} ({})".format(
+            quote(model._meta.db_table), ", ".join(quote(field.column) for field in fields)
+        )
+        with self.connection.cursor() as cursor:
+            self.copy_rows(cursor.cursor, target, batch)
+
+    def copy_rows(self, raw_cursor, target: str, batch: List[Tuple]) -> None:
+        if hasattr(raw_cursor, "copy"):
+            with raw_cursor.copy(f"COPY {target} FROM STDIN") as copy:
+                for row in batch:
+                    copy.write_row(row)
+        else:
+            raw_cursor.copy_expert(f"COPY {target} FROM STDIN", io.StringIO(copy_text_rows(batch)))
+
+
+BULK_WRITERS = {
+    "postgresql": PostgresCopyWriter,
+    "sqlite": SQLiteBulkWriter,
+}
+
+
+def get_bulk_writer(using: str = "default") -> BulkWriter:
+    """
+    Pick the writer for the configured engine, honouring an explicit
+    ``EQUIPMENT_BULK_WRITER`` dotted path override.
+    """
+
+    override = getattr(settings, "EQUIPMENT_BULK_WRITER", None)
+    if override:
+        writer_class = import_string(override)
+    else:
+        writer_class = BULK_WRITERS.get(connections[using].vendor, ORMBulkWriter)
+    return writer_class(using=using)
+
+
+def write_records(dataset, rows: Iterable[Sequence], using: str = "default") -> int:
+    """
+    Bulk insert ``rows`` (ordered like ``RECORD_FIELDS``) for ``dataset`` and
+    add them to the search index.
+    """
+
+    written = get_bulk_writer(using).write(
+        EquipmentRecord, RECORD_FIELDS, rows, extra={"dataset": dataset.pk}
+    )
+    index_records(dataset, using)
+    return written
+
+
+def write_anomalies(dataset, rows: Iterable[Sequence], using: str = "default") -> int:
+    """
+    Bulk insert anomaly ``rows`` (ordered like ``ANOMALY_FIELDS``).
+    """
+
+    return get_bulk_writer(using).write(
+        EquipmentAnomaly, ANOMALY_FIELDS, rows, extra={"dataset": dataset.pk}
+    )
+
+
+def store_dataset(parsed, using: str = "default") -> EquipmentDataset:
+    """
+    Write a ``parsing.ParsedDataset`` (dataset row, records, anomalies and its
+    change feed event). Callers own the transaction.
+    """
+
+    dataset = EquipmentDataset.objects.using(using).create(
+        file_name=parsed.file_name,
+        summary=parsed.summary,
+        columns=parsed.columns,
+        integer_columns=parsed.integer_columns,
+        checksum=parsed.checksum,
+    )
+    write_records(dataset, parsed.record_rows(), using)
+    write_anomalies(dataset, parsed.anomalies, using)
+    record_dataset_created(dataset)
+    return dataset
+
+
+def prune_history(limit: int | None = None) -> List:
+    """
+    Delete all but the newest ``limit`` datasets (default
+    ``EQUIPMENT_HISTORY_LIMIT``) and announce the removals. Change feed
+    events past their retention go at the same time.
+    """
+
+    if limit is None:
+        limit = settings.EQUIPMENT_HISTORY_LIMIT
+    ids_to_keep = list(
+        EquipmentDataset.objects.order_by("-uploaded_at").values_list("id", flat=True)[:limit]
+    )
+    stale = EquipmentDataset.objects.exclude(id__in=ids_to_keep)
+    stale_ids = list(stale.values_list("id", flat=True))
+    if stale_ids:
+        stale.delete()
+        record_datasets_pruned(stale_ids)
+    prune_events()
+    return stale_ids
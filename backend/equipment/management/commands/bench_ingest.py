@@ -0,0 +1,44 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from ...ingest import ORMBulkWriter, RECORD_FIELDS, get_bulk_writer
+from ...models import EquipmentDataset, EquipmentRecord
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Measures record ingest throughput of the engine's bulk writer against the ORM "
+        "fallback. Everything is written inside a transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=50000, help="Rows written per writer.")
+
+    def handle(self, *args, **options):
+        rows = options["rows"]
+        for writer in (get_bulk_writer(), ORMBulkWriter()):
+            rate = self._measure(writer, rows)
+            self.stdout.write(
+                f"{connection.vendor} {writer.__class__.__name__}: {rate:,.0f} rows/s ({rows} rows)"
+            )
+
+    def _measure(self, writer, rows):
+        values = (
+            (index, f"Pump-{index}", "Pump", 100.0, 5.5, 300.0, {}) for index in range(rows)
+        )
+        try:
+            with transaction.atomic():
+                dataset = EquipmentDataset.objects.create(file_name="bench.csv", summary={})
+                started = time.perf_counter()
+                writer.write(EquipmentRecord, RECORD_FIELDS, values, extra={"dataset": dataset.pk})
+                elapsed = time.perf_counter() - started
+                raise _Rollback
+        except _Rollback:
+            pass
+        return rows / elapsed
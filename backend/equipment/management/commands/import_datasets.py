@@ -0,0 +1,154 @@
+import glob
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from ...events import record_event
+from ...ingest import prune_history, store_dataset
+from ...models import DatasetEvent, EquipmentDataset
+from ...parsing import init_import_worker, parse_file
+
+SOURCE_PATTERNS = ("*.csv", "*.csv.gz", "*.csv.zst", "*.zip")
+
+class Command(BaseCommand):
+    help = (
+        "Imports historical CSV exports (plain, .csv.gz, .csv.zst or single-entry .zip) from "
+        "directories or glob patterns. Files are parsed in parallel and written by one process "
+        "in batched transactions; files imported before are skipped by checksum."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "sources", nargs="+", help="Directories, files or glob patterns (quote globs)."
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=max(1, (os.cpu_count() or 2) - 1),
+            help="Parser processes (0 parses in this process).",
+        )
+        parser.add_argument(
+            "--batch-size", type=int, default=20, help="Datasets written per transaction."
+        )
+        parser.add_argument(
+            "--prune",
+            action="store_true",
+            help=(
+                "Prune to EQUIPMENT_HISTORY_LIMIT afterwards. Pruned files lose their checksum "
+                "and are imported again on the next run."
+            ),
+        )
+
+    def handle(self, *args, **options):
+        paths = self._discover(options["sources"])
+        if not paths:
+            raise CommandError("No CSV exports matched: " + ", ".join(options["sources"]))
+        batch_size = max(1, options["batch_size"])
+
+        known = frozenset(
+            EquipmentDataset.objects.exclude(checksum="").values_list("checksum", flat=True)
+        )
+        self.stats = {"imported": 0, "skipped": 0, "failed": 0, "rows": 0, "bytes": 0}
+        self.total = len(paths)
+        self.done = 0
+        self.started = time.perf_counter()
+        seen = set(known)
+        batch = []
+
+        for path, status, payload in self._parse_all(paths, options["workers"], known):
+            self.done += 1
+            if status == "parsed" and payload.checksum in seen:
+                status = "skipped"
+            if status == "skipped":
+                self.stats["skipped"] += 1
+            elif status == "failed":
+                self.stats["failed"] += 1
+                self.stderr.write(f"{path}: {payload}")
+            else:
+                seen.add(payload.checksum)
+                self.stats["bytes"] += os.path.getsize(path)
+                batch.append(payload)
+                if len(batch) >= batch_size:
+                    self._write(batch)
+                    batch = []
+        if batch:
+            self._write(batch)
+
+        pruned = prune_history() if options["prune"] else []
+        elapsed = time.perf_counter() - self.started
+        record_event(
+            DatasetEvent.JOB_FINISHED,
+            payload={
+                "job": "import_datasets",
+                **{key: self.stats[key] for key in ("imported", "skipped", "failed", "rows")},
+                "pruned": len(pruned),
+                "duration_s": round(elapsed, 2),
+            },
+        )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Imported {self.stats['imported']} of {self.total} files "
+                f"({self.stats['skipped']} skipped, {self.stats['failed']} failed, "
+                f"{len(pruned)} pruned) in {elapsed:.1f}s: {self._rates(elapsed)}"
+            )
+        )
+
+    def _discover(self, sources):
+        found = set()
+        for source in sources:
+            if os.path.isdir(source):
+                for pattern in SOURCE_PATTERNS:
+                    found.update(glob.glob(os.path.join(source, pattern)))
+            else:
+                found.update(path for path in glob.glob(source) if os.path.isfile(path))
+        # Oldest first, so the newest export ends up as the latest dataset.
+        return sorted(found, key=lambda path: (os.path.getmtime(path), path))
+
+    def _parse_all(self, paths, workers, known):
+        """
+        Yield ``parse_file`` results in input order, keeping at most two
+        parsed files per worker in flight so memory stays bounded.
+        """
+
+        if workers <= 0:
+            init_import_worker(known)
+            for path in paths:
+                yield parse_file(path)
+            return
+        with ProcessPoolExecutor(
+            max_workers=workers, initializer=init_import_worker, initargs=(known,)
+        ) as pool:
+            pending = deque()
+            queued = iter(paths)
+            for path in queued:
+                pending.append(pool.submit(parse_file, path))
+                if len(pending) >= workers * 2:
+                    break
+            while pending:
+                yield pending.popleft().result()
+                for path in queued:
+                    pending.append(pool.submit(parse_file, path))
+                    break
+
+    def _write(self, batch):
+        with transaction.atomic():
+            for parsed in batch:
+                store_dataset(parsed)
+        self.stats["imported"] += len(batch)
+        self.stats["rows"] += sum(parsed.summary["total_equipment"] for parsed in batch)
+        elapsed = time.perf_counter() - self.started
+        self.stdout.write(
+            f"[{self.done}/{self.total}] {self.stats['imported']} imported, "
+            f"{self.stats['skipped']} skipped, {self.stats['failed']} failed - {self._rates(elapsed)}"
+        )
+
+    def _rates(self, elapsed):
+        elapsed = elapsed or 1e-9
+        return (
+            f"{self.done / elapsed:.1f} files/s, {self.stats['rows'] / elapsed:,.0f} rows/s, "
+            f"{self.stats['bytes'] / 2**20 / elapsed:.1f} MiB/s"
+        )
@@ -0,0 +1,321 @@
+import json
+import math
+import random
+import threading
+import time
+import uuid
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from http.client import HTTPException
+from pathlib import Path
+from urllib.error import HTTPError, URLError
+from urllib.request import Request, urlopen
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+EQUIPMENT_TYPES = ("Pump", "Compressor", "Valve", "HeatExchanger", "Reactor", "Condenser")
+DEFAULT_MIX = "history=6,latest=3,upload=1,pdf=1"
+
+
+def percentile(samples, fraction):
+    """
+    Nearest-rank percentile of ``samples`` (``fraction`` in 0..1).
+    """
+
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(1, math.ceil(fraction * len(ordered)))
+    return ordered[rank - 1]
+
+
+def build_csv(rows, rng):
+    lines = ["Equipment Name,Type,Flowrate,Pressure,Temperature"]
+    for index in range(rows):
+        equipment_type = rng.choice(EQUIPMENT_TYPES)
+        lines.append(
+            f"{equipment_type}-{index},{equipment_type},"
+            f"{rng.uniform(50, 250):.1f},{rng.uniform(2, 12):.2f},{rng.uniform(80, 400):.1f}"
+        )
+    return ("\n".join(lines) + "\n").encode()
+
+
+def multipart_body(file_name, payload):
+    boundary = uuid.uuid4().hex
+    body = b"".join(
+        [
+            f"--{boundary}\r\n".encode(),
+            f'Content-Disposition: form-data; name="file"; filename="{file_name}"\r\n'.encode(),
+            b"Content-Type: text/csv\r\n\r\n",
+            payload,
+            f"\r\n--{boundary}--\r\n".encode(),
+        ]
+    )
+    return body, f"multipart/form-data; boundary={boundary}"
+
+
+def process_rss_bytes(pid):
+    """
+    Resident set size of ``pid`` plus its child processes (gunicorn workers),
+    read from ``/proc``. Returns ``None`` where ``/proc`` is unavailable.
+    """
+
+    total = 0
+    pending = [int(pid)]
+    seen = set()
+    try:
+        while pending:
+            current = pending.pop()
+            if current in seen:
+                continue
+            seen.add(current)
+            status = Path(f"/proc/{current}/status").read_text()
+            for line in status.splitlines():
+                if line.startswith("VmRSS:"):
+                    total += int(line.split()[1]) * 1024
+            for task in Path(f"/proc/{current}/task").iterdir():
+                children = (task / "children").read_text().split()
+                pending.extend(int(child) for child in children)
+    except (FileNotFoundError, PermissionError, ValueError):
+        return total or None
+    return total
+
+
+class Command(BaseCommand):
+    help = (
+        "Drives a running API with a mix of uploads, history/latest polls and PDF downloads "
+        "and reports throughput, latency percentiles, error rates and server RSS."
+    )
+    # Set by ``_login``; requests made before that go out unauthenticated.
+    token = None
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--base-url", default="http://127.0.0.1:8000/api", help="API root of the server under test."
+        )
+        parser.add_argument("--username", default="demo", help="User created by create_demo_user.")
+        parser.add_argument("--password", default="demo123", help="Password for --username.")
+        parser.add_argument("--concurrency", type=int, default=8, help="Parallel simulated clients.")
+        parser.add_argument("--duration", type=float, default=30.0, help="Seconds to run for.")
+        parser.add_argument(
+            "--mix",
+            default=DEFAULT_MIX,
+            help=f"Relative weights per scenario (history, latest, upload, pdf). Default: {DEFAULT_MIX}",
+        )
+        parser.add_argument(
+            "--upload-rows",
+            default="100,1000,10000",
+            help="Comma separated CSV sizes (rows) to pick from for uploads.",
+        )
+        parser.add_argument(
+            "--server-pid", type=int, help="PID of the server (master) process to sample RSS from."
+        )
+        parser.add_argument("--seed", type=int, default=0, help="Random seed for the request mix.")
+        parser.add_argument("--json", action="store_true", help="Print the report as JSON.")
+
+    def handle(self, *args, **options):
+        self.base_url = options["base_url"].rstrip("/")
+        weights = self._parse_mix(options["mix"])
+        try:
+            upload_sizes = [int(size) for size in options["upload_rows"].split(",") if size]
+        except ValueError:
+            raise CommandError("--upload-rows must be a comma separated list of integers.")
+
+        self.token = self._login(options["username"], options["password"])
+        self.dataset_ids = [item["id"] for item in self._get_json("datasets/history/")]
+        self.lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.rss_samples = []
+
+        rng = random.Random(options["seed"])
+        # Pre-generate payloads so CSV building does not skew client timings.
+        payloads = {rows: build_csv(rows, rng) for rows in upload_sizes}
+        deadline = time.perf_counter() + options["duration"]
+        stop = threading.Event()
+        sampler = None
+        if options["server_pid"]:
+            sampler = threading.Thread(
+                target=self._sample_rss, args=(options["server_pid"], stop), daemon=True
+            )
+            sampler.start()
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options["concurrency"]) as pool:
+            clients = [
+                pool.submit(
+                    self._client_loop,
+                    random.Random(options["seed"] + worker + 1),
+                    weights,
+                    payloads,
+                    deadline,
+                )
+                for worker in range(options["concurrency"])
+            ]
+        elapsed = time.perf_counter() - started
+        stop.set()
+        if sampler:
+            sampler.join()
+        # A client that died stopped generating load; the report must say so.
+        crashed = [
+            f"{exc.__class__.__name__}: {exc}"
+            for exc in (client.exception() for client in clients)
+            if exc is not None
+        ]
+
+        report = self._report(elapsed, options["concurrency"], crashed)
+        if options["json"]:
+            self.stdout.write(json.dumps(report, indent=2))
+        else:
+            self._print_report(report)
+        if crashed:
+            raise CommandError(
+                f"{len(crashed)} of {options['concurrency']} simulated clients crashed; "
+                "the load was lower than requested."
+            )
+
+    def _parse_mix(self, mix):
+        weights = {}
+        for part in mix.split(","):
+            name, _, weight = part.partition("=")
+            name = name.strip()
+            if name not in ("history", "latest", "upload", "pdf"):
+                raise CommandError(f"Unknown scenario in --mix: {name}")
+            try:
+                weights[name] = float(weight)
+            except ValueError:
+                raise CommandError(f"Invalid weight for {name}: {weight}")
+        if not any(weights.values()):
+            raise CommandError("--mix needs at least one positive weight.")
+        return weights
+
+    def _open(self, path, data=None, headers=None, method=None):
+        request = Request(f"{self.base_url}/{path}", data=data, headers=headers or {}, method=method)
+        if self.token:
+            request.add_header("Authorization", f"Token {self.token}")
+        with urlopen(request, timeout=120) as response:
+            return response.status, response.read()
+
+    def _get_json(self, path):
+        _, body = self._open(path)
+        return json.loads(body)
+
+    def _login(self, username, password):
+        payload = json.dumps({"username": username, "password": password}).encode()
+        try:
+            _, body = self._open(
+                "auth/token/", data=payload, headers={"Content-Type": "application/json"}
+            )
+        except (HTTPError, URLError) as exc:
+            raise CommandError(
+                f"Unable to log in at {self.base_url}: {exc}. "
+                "Is the server running and create_demo_user applied?"
+            )
+        return json.loads(body)["token"]
+
+    def _client_loop(self, rng, weights, payloads, deadline):
+        names = list(weights)
+        scenario_weights = [weights[name] for name in names]
+        while time.perf_counter() < deadline:
+            scenario = rng.choices(names, scenario_weights)[0]
+            if scenario == "upload":
+                rows = rng.choice(list(payloads))
+                self._timed(f"upload ({rows} rows)", self._upload, rows, payloads[rows])
+            elif scenario == "pdf":
+                with self.lock:
+                    dataset_id = rng.choice(self.dataset_ids) if self.dataset_ids else None
+                if dataset_id is None:
+                    continue
+                self._timed("pdf", self._open, f"datasets/{dataset_id}/pdf/")
+            else:
+                self._timed(scenario, self._open, f"datasets/{scenario}/")
+
+    def _upload(self, rows, payload):
+        body, content_type = multipart_body(f"loadtest-{rows}.csv", payload)
+        status, response = self._open(
+            "upload/", data=body, headers={"Content-Type": content_type}, method="POST"
+        )
+        dataset_id = json.loads(response)["id"]
+        with self.lock:
+            # Uploads prune history, so only recent ids stay downloadable.
+            self.dataset_ids = ([dataset_id] + self.dataset_ids)[: settings.EQUIPMENT_HISTORY_LIMIT]
+        return status, response
+
+    def _timed(self, endpoint, call, *args):
+        started = time.perf_counter()
+        failed = False
+        try:
+            call(*args)
+        except HTTPError as exc:
+            # 404 on latest just means nothing was uploaded yet.
+            failed = not (exc.code == 404 and endpoint == "latest")
+        except (URLError, HTTPException, OSError, ValueError):
+            failed = True
+        latency = time.perf_counter() - started
+        with self.lock:
+            self.latencies[endpoint].append(latency)
+            if failed:
+                self.errors[endpoint] += 1
+
+    def _sample_rss(self, pid, stop):
+        while not stop.is_set():
+            rss = process_rss_bytes(pid)
+            if rss is not None:
+                self.rss_samples.append(rss)
+            stop.wait(0.5)
+
+    def _report(self, elapsed, concurrency, crashed=()):
+        endpoints = {}
+        total = 0
+        total_errors = 0
+        for endpoint in sorted(self.latencies):
+            samples = self.latencies[endpoint]
+            errors = self.errors[endpoint]
+            total += len(samples)
+            total_errors += errors
+            endpoints[endpoint] = {
+                "requests": len(samples),
+                "throughput_rps": round(len(samples) / elapsed, 2),
+                "error_rate": round(errors / len(samples), 4),
+                "p50_ms": round(percentile(samples, 0.50) * 1000, 1),
+                "p95_ms": round(percentile(samples, 0.95) * 1000, 1),
+                "p99_ms": round(percentile(samples, 0.99) * 1000, 1),
+            }
+        report = {
+            "duration_s": round(elapsed, 2),
+            "concurrency": concurrency,
+            "requests": total,
+            "throughput_rps": round(total / elapsed, 2) if elapsed else 0.0,
+            "error_rate": round(total_errors / total, 4) if total else 0.0,
+            "endpoints": endpoints,
+            "crashed_clients": list(crashed),
+        }
+        if self.rss_samples:
+            report["server_rss_mb"] = {
+                "peak": round(max(self.rss_samples) / 2**20, 1),
+                "last": round(self.rss_samples[-1] / 2**20, 1),
+            }
+        return report
+
+    def _print_report(self, report):
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{report['requests']} requests in {report['duration_s']}s "
+                f"at concurrency {report['concurrency']}: "
+                f"{report['throughput_rps']} req/s, {report['error_rate']:.2%} errors"
+            )
+        )
+        header = f"{'endpoint':<24}{'reqs':>8}{'req/s':>9}{'err%':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"
+        self.stdout.write(header)
+        for endpoint, stats in report["endpoints"].items():
+            self.stdout.write(
+                f"{endpoint:<24}{stats['requests']:>8}{stats['throughput_rps']:>9}"
+                f"{stats['error_rate'] * 100:>7.2f}%{stats['p50_ms']:>10}{stats['p95_ms']:>10}"
+                f"{stats['p99_ms']:>10}"
+            )
+        if "server_rss_mb" in report:
+            rss = report["server_rss_mb"]
+            self.stdout.write(f"server RSS: peak {rss['peak']} MB, last {rss['last']} MB")
+        for failure in report["crashed_clients"]:
+            self.stderr.write(f"client crashed: {failure}")
@@ -0,0 +1,94 @@
+# Generated by Django 5.2.8 on 2026-10-19 00:26
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+COLUMN_FIELDS = {
+    "equipment name": "equipment_name",
+    "type": "equipment_type",
+    "flowrate": "flowrate",
+    "pressure": "pressure",
+    "temperature": "temperature",
+}
+
+
+NUMERIC_FIELDS = {"flowrate", "pressure", "temperature"}
+
+
+def move_rows_to_records(apps, schema_editor):
+    """
+    Copy every ``data`` row into ``EquipmentRecord``. Columns outside
+    ``COLUMN_FIELDS`` go to ``extra`` and whole-number readings are noted in
+    ``integer_columns``, so the rows read back exactly as before.
+    """
+
+    EquipmentDataset = apps.get_model("equipment", "EquipmentDataset")
+    EquipmentRecord = apps.get_model("equipment", "EquipmentRecord")
+    for dataset in EquipmentDataset.objects.all():
+        rows = dataset.data or []
+        headers = list(rows[0]) if rows else []
+        typed = [key for key in headers if key.strip().lower() in COLUMN_FIELDS]
+        extras = [key for key in headers if key not in typed]
+        dataset.columns = headers
+        dataset.integer_columns = [
+            key
+            for key in typed
+            if COLUMN_FIELDS[key.strip().lower()] in NUMERIC_FIELDS
+            and all(isinstance(row.get(key), int) and not isinstance(row.get(key), bool) for row in rows)
+        ]
+        dataset.save(update_fields=["columns", "integer_columns"])
+        EquipmentRecord.objects.bulk_create(
+            [
+                EquipmentRecord(
+                    dataset=dataset,
+                    row_index=index,
+                    extra={key: row.get(key) for key in extras},
+                    **{COLUMN_FIELDS[key.strip().lower()]: row.get(key) for key in typed},
+                )
+                for index, row in enumerate(rows)
+            ],
+            batch_size=5000,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('equipment', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='equipmentdataset',
+            name='columns',
+            field=models.JSONField(default=list),
+        ),
+        migrations.AddField(
+            model_name='equipmentdataset',
+            name='integer_columns',
+            field=models.JSONField(default=list),
+        ),
+        migrations.CreateModel(
+            name='EquipmentRecord',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('row_index', models.PositiveIntegerField()),
+                ('equipment_name', models.TextField()),
+                ('equipment_type', models.TextField()),
+                ('flowrate', models.FloatField()),
+                ('pressure', models.FloatField()),
+                ('temperature', models.FloatField()),
+                ('extra', models.JSONField(default=dict)),
+                ('dataset', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='records', to='equipment.equipmentdataset')),
+            ],
+            options={
+                'ordering': ('dataset', 'row_index'),
+                'constraints': [models.UniqueConstraint(fields=('dataset', 'row_index'), name='equipment_record_position')],
+            },
+        ),
+        migrations.RunPython(move_rows_to_records, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='equipmentdataset',
+            name='data',
+        ),
+    ]
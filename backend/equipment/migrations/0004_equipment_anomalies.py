@@ -0,0 +1,31 @@
+# Generated by Django 5.2.8 on 2026-10-19 00:31
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('equipment', '0003_record_type_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EquipmentAnomaly',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('row_index', models.PositiveIntegerField()),
+                ('equipment_name', models.TextField()),
+                ('equipment_type', models.TextField()),
+                ('metric', models.CharField(choices=[('flowrate', 'Flowrate'), ('pressure', 'Pressure'), ('temperature', 'Temperature')], max_length=16)),
+                ('value', models.FloatField()),
+                ('score', models.FloatField(null=True)),
+                ('dataset', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='anomalies', to='equipment.equipmentdataset')),
+            ],
+            options={
+                'ordering': ('dataset', 'row_index', 'metric'),
+                'indexes': [models.Index(fields=['dataset', 'row_index'], name='equipment_anomaly_row')],
+            },
+        ),
+    ]
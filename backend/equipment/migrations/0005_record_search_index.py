@@ -0,0 +1,79 @@
+from django.db import migrations
+from django.db.utils import OperationalError
+
+# Rows are indexed in bulk right after ingest (equipment.search.index_records);
+# the delete trigger drops them when a dataset is pruned or deleted.
+SQLITE_FORWARD = [
+    """
+    CREATE VIRTUAL TABLE equipment_record_search USING fts5(
+        equipment_name,
+        equipment_type,
+        content='equipment_equipmentrecord',
+        content_rowid='id',
+        tokenize='trigram'
+    )
+    """,
+    """
+    CREATE TRIGGER equipment_record_search_delete AFTER DELETE ON equipment_equipmentrecord
+    BEGIN
+        INSERT INTO equipment_record_search(equipment_record_search, rowid, equipment_name, equipment_type)
+        VALUES ('delete', old.id, old.equipment_name, old.equipment_type);
+    END
+    """,
+    "INSERT INTO equipment_record_search(equipment_record_search) VALUES ('rebuild')",
+]
+
+SQLITE_REVERSE = [
+    "DROP TRIGGER IF EXISTS equipment_record_search_delete",
+    "DROP TABLE IF EXISTS equipment_record_search",
+]
+
+POSTGRES_FORWARD = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX equipment_record_name_trgm ON equipment_equipmentrecord "
+    "USING gin (UPPER(equipment_name) gin_trgm_ops)",
+    "CREATE INDEX equipment_record_type_trgm ON equipment_equipmentrecord "
+    "USING gin (UPPER(equipment_type) gin_trgm_ops)",
+]
+
+POSTGRES_REVERSE = [
+    "DROP INDEX IF EXISTS equipment_record_name_trgm",
+    "DROP INDEX IF EXISTS equipment_record_type_trgm",
+]
+
+
+def _run(schema_editor, statements):
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "sqlite":
+        try:
+            _run(schema_editor, SQLITE_FORWARD)
+        except OperationalError:
+            # SQLite built without FTS5 trigram support (< 3.34): searches fall
+            # back to scanning the records table.
+            _run(schema_editor, SQLITE_REVERSE)
+    elif vendor == "postgresql":
+        _run(schema_editor, POSTGRES_FORWARD)
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "sqlite":
+        _run(schema_editor, SQLITE_REVERSE)
+    elif vendor == "postgresql":
+        _run(schema_editor, POSTGRES_REVERSE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('equipment', '0004_equipment_anomalies'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.8 on 2026-10-19 00:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('equipment', '0005_record_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DatasetEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('dataset.created', 'Dataset created'), ('dataset.pruned', 'Dataset pruned'), ('job.finished', 'Job finished')], max_length=32)),
+                ('dataset_id', models.UUIDField(blank=True, null=True)),
+                ('payload', models.JSONField(default=dict)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ('id',),
+            },
+        ),
+    ]
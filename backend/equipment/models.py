@@ -1,21 +1,179 @@
 import uuid
+from operator import itemgetter
 
 from django.db import models
 
+# Normalized CSV header -> EquipmentRecord field.
+COLUMN_FIELDS = {
+    "equipment name": "equipment_name",
+    "type": "equipment_type",
+    "flowrate": "flowrate",
+    "pressure": "pressure",
+    "temperature": "temperature",
+}
+
 
 class EquipmentDataset(models.Model):
     """
     Stores a snapshot of a CSV upload plus calculated summary metrics.
+
+    The uploaded rows live in ``EquipmentRecord``; ``columns`` keeps every
+    CSV header (in upload order) so responses can echo them back, and
+    ``integer_columns`` the typed numeric headers that held whole numbers.
     """
 
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     file_name = models.CharField(max_length=255)
     uploaded_at = models.DateTimeField(auto_now_add=True)
     summary = models.JSONField()
-    data = models.JSONField()
+    columns = models.JSONField(default=list)
+    integer_columns = models.JSONField(default=list)
+    # SHA-256 of the source file for bulk imports, so re-runs skip it.
+    checksum = models.CharField(max_length=64, blank=True, db_index=True)
 
     class Meta:
         ordering = ("-uploaded_at",)
 
     def __str__(self) -> str:
         return f"{self.file_name} ({self.uploaded_at:%Y-%m-%d %H:%M})"
+
+    def record_fields(self):
+        """
+        Pair each stored CSV header with its ``EquipmentRecord`` field;
+        headers outside ``COLUMN_FIELDS`` live in ``EquipmentRecord.extra``
+        and pair with ``None``.
+        """
+
+        return [(header, COLUMN_FIELDS.get(header.strip().lower())) for header in self.columns]
+
+    def iter_values(self, pairs=None, records=None, chunk_size=2000):
+        """
+        Yield value tuples for ``(header, field)`` pairs (default: every
+        column) from ``records`` (default: all rows in upload order), with
+        integer columns read back as ``int``.
+        """
+
+        pairs = self.record_fields() if pairs is None else pairs
+        records = self.records.order_by("row_index") if records is None else records
+        typed = [field for _, field in pairs if field]
+        wants_extra = len(typed) < len(pairs)
+        integers = set(self.integer_columns)
+        queryset = records.values_list(*typed, *(("extra",) if wants_extra else ()))
+        if not wants_extra and not integers.intersection(header for header, _ in pairs):
+            yield from queryset.iterator(chunk_size=chunk_size)
+            return
+
+        getters = []
+        position = {field: index for index, field in enumerate(typed)}
+        for header, field in pairs:
+            if field is None:
+                getters.append(lambda row, header=header, at=len(typed): row[at].get(header))
+            elif header in integers:
+                getters.append(lambda row, at=position[field]: int(row[at]))
+            else:
+                getters.append(itemgetter(position[field]))
+        for row in queryset.iterator(chunk_size=chunk_size):
+            yield tuple(getter(row) for getter in getters)
+
+    def iter_rows(self, limit=None, chunk_size=2000):
+        """
+        Yield rows as dicts keyed by the original CSV headers, in upload order.
+        """
+
+        pairs = self.record_fields()
+        headers = [header for header, _ in pairs]
+        records = self.records.order_by("row_index")
+        if limit is not None:
+            records = records[:limit]
+        for values in self.iter_values(pairs, records, chunk_size):
+            yield dict(zip(headers, values))
+
+
+class EquipmentRecord(models.Model):
+    """
+    One typed CSV row belonging to a dataset.
+    """
+
+    dataset = models.ForeignKey(
+        EquipmentDataset, related_name="records", on_delete=models.CASCADE
+    )
+    row_index = models.PositiveIntegerField()
+    equipment_name = models.TextField()
+    equipment_type = models.TextField()
+    flowrate = models.FloatField()
+    pressure = models.FloatField()
+    temperature = models.FloatField()
+    # Values of the CSV columns outside ``COLUMN_FIELDS``, keyed by header.
+    extra = models.JSONField(default=dict)
+
+    class Meta:
+        ordering = ("dataset", "row_index")
+        indexes = [
+            models.Index(fields=("dataset", "equipment_type"), name="equipment_record_type"),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=("dataset", "row_index"), name="equipment_record_position"
+            ),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.equipment_name} ({self.equipment_type})"
+
+
+class EquipmentAnomaly(models.Model):
+    """
+    A reading flagged as out of range for its equipment type at ingest.
+    """
+
+    METRIC_CHOICES = (
+        ("flowrate", "Flowrate"),
+        ("pressure", "Pressure"),
+        ("temperature", "Temperature"),
+    )
+
+    dataset = models.ForeignKey(
+        EquipmentDataset, related_name="anomalies", on_delete=models.CASCADE
+    )
+    row_index = models.PositiveIntegerField()
+    equipment_name = models.TextField()
+    equipment_type = models.TextField()
+    metric = models.CharField(max_length=16, choices=METRIC_CHOICES)
+    value = models.FloatField()
+    score = models.FloatField(null=True)
+
+    class Meta:
+        ordering = ("dataset", "row_index", "metric")
+        indexes = [
+            models.Index(fields=("dataset", "row_index"), name="equipment_anomaly_row"),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.equipment_name} {self.metric}={self.value}"
+
+
+class DatasetEvent(models.Model):
+    """
+    Change feed, trimmed by ``events.prune_events``; the auto-incrementing
+    id doubles as the cursor clients resume from.
+    """
+
+    DATASET_CREATED = "dataset.created"
+    DATASET_PRUNED = "dataset.pruned"
+    JOB_FINISHED = "job.finished"
+    KIND_CHOICES = (
+        (DATASET_CREATED, "Dataset created"),
+        (DATASET_PRUNED, "Dataset pruned"),
+        (JOB_FINISHED, "Job finished"),
+    )
+
+    kind = models.CharField(max_length=32, choices=KIND_CHOICES)
+    dataset_id = models.UUIDField(null=True, blank=True)
+    payload = models.JSONField(default=dict)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ("id",)
+
+    def __str__(self) -> str:
+        return f"#{self.pk} {self.kind}"
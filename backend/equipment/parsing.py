@@ -0,0 +1,181 @@
+from __future__ import annotations
+
+import hashlib
+import os
+from dataclasses import dataclass, field
+from itertools import repeat
+from typing import Dict, Iterator, List, Tuple
+
+import pandas as pd
+
+from .anomalies import detect_anomalies
+from .compression import compression_from_name, csv_file_name, open_csv, sniff_compression
+
+REQUIRED_COLUMNS = {
+    "equipment name": "Equipment Name",
+    "type": "Type",
+    "flowrate": "Flowrate",
+    "pressure": "Pressure",
+    "temperature": "Temperature",
+}
+NUMERIC_COLUMNS = ("flowrate", "pressure", "temperature")
+
+
+@dataclass
+class ParsedDataset:
+    """
+    A validated CSV with its summary and anomalies, ready to be written.
+
+    Holds no database state, so it can be produced in a worker process and
+    pickled back to the writer.
+    """
+
+    file_name: str
+    frame: pd.DataFrame
+    lookup: Dict[str, str]
+    summary: Dict
+    anomalies: List[Tuple] = field(default_factory=list)
+    checksum: str = ""
+
+    @property
+    def columns(self) -> List[str]:
+        return [str(column) for column in self.frame.columns]
+
+    @property
+    def extra_columns(self) -> List[str]:
+        return [column for column in self.columns if column.strip().lower() not in REQUIRED_COLUMNS]
+
+    @property
+    def integer_columns(self) -> List[str]:
+        """
+        Numeric readings that parsed as whole numbers; they are stored as
+        floats and turned back into ints on the way out.
+        """
+
+        return [
+            self.lookup[key]
+            for key in NUMERIC_COLUMNS
+            if pd.api.types.is_integer_dtype(self.frame[self.lookup[key]])
+        ]
+
+    def record_rows(self) -> Iterator[Tuple]:
+        """
+        Row tuples ordered like ``ingest.RECORD_FIELDS``.
+        """
+
+        df, lookup = self.frame, self.lookup
+        names = df[lookup["equipment name"]].fillna("").astype(str)
+        types = df[lookup["type"]].fillna("").astype(str)
+        extras = self.extra_columns
+        if extras:
+            frame = df[extras].astype(object)
+            extra_values = frame.where(frame.notna(), None).to_dict(orient="records")
+        else:
+            extra_values = repeat({}, len(df))
+        return zip(
+            range(len(df)),
+            names.tolist(),
+            types.tolist(),
+            df[lookup["flowrate"]].astype(float).tolist(),
+            df[lookup["pressure"]].astype(float).tolist(),
+            df[lookup["temperature"]].astype(float).tolist(),
+            extra_values,
+        )
+
+
+def build_column_lookup(columns) -> Dict[str, str]:
+    lookup = {}
+    for column in columns:
+        normalized = column.strip().lower()
+        lookup[normalized] = column
+    return lookup
+
+
+def validate_columns(lookup) -> None:
+    missing = [label for label in REQUIRED_COLUMNS if label not in lookup]
+    if missing:
+        raise ValueError(
+            "CSV is missing required columns: " + ", ".join(REQUIRED_COLUMNS[key] for key in missing)
+        )
+
+
+def build_summary(df: pd.DataFrame, lookup: Dict[str, str]) -> Dict[str, float]:
+    type_column = lookup["type"]
+    summary = {
+        "total_equipment": int(len(df)),
+        "avg_flowrate": round(df[lookup["flowrate"]].mean(), 2),
+        "avg_pressure": round(df[lookup["pressure"]].mean(), 2),
+        "avg_temperature": round(df[lookup["temperature"]].mean(), 2),
+        "type_distribution": df[type_column].value_counts().to_dict(),
+    }
+    return summary
+
+
+def parse_csv(stream, file_name: str) -> ParsedDataset:
+    """
+    Read, validate and summarize a CSV stream. Raises ``ValueError`` for
+    missing columns or unparseable numbers.
+    """
+
+    data_frame = pd.read_csv(stream)
+    column_lookup = build_column_lookup(data_frame.columns)
+    validate_columns(column_lookup)
+
+    numeric_columns = [column_lookup[key] for key in NUMERIC_COLUMNS]
+    for column in numeric_columns:
+        data_frame[column] = pd.to_numeric(data_frame[column], errors="coerce")
+
+    if data_frame[numeric_columns].isnull().any().any():
+        raise ValueError("Numeric columns contain invalid values that cannot be parsed.")
+
+    anomalies = detect_anomalies(data_frame, column_lookup)
+    summary = build_summary(data_frame, column_lookup)
+    summary["anomaly_count"] = len(anomalies)
+    return ParsedDataset(
+        file_name=file_name,
+        frame=data_frame,
+        lookup=column_lookup,
+        summary=summary,
+        anomalies=anomalies,
+    )
+
+
+# Bulk import workers. They only need pandas and this module, never the ORM,
+# so they also run under the "spawn" and "forkserver" start methods where
+# Django is not set up in the child.
+
+# Checksums already in the database, handed to each worker once.
+_known_checksums = frozenset()
+
+
+def init_import_worker(known_checksums) -> None:
+    global _known_checksums
+    _known_checksums = known_checksums
+
+
+def file_checksum(path: str, chunk_size: int = 1 << 20) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as handle:
+        for chunk in iter(lambda: handle.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def parse_file(path: str) -> Tuple[str, str, object]:
+    """
+    Checksum, parse and summarize one export. Runs in a worker process and
+    returns ``(path, status, payload)`` where status is ``parsed`` (payload is
+    a ``ParsedDataset``), ``skipped`` or ``failed`` (payload is the error).
+    """
+
+    try:
+        checksum = file_checksum(path)
+        if checksum in _known_checksums:
+            return path, "skipped", None
+        with open(path, "rb") as handle:
+            compression = compression_from_name(path) or sniff_compression(handle)
+            parsed = parse_csv(open_csv(handle, compression), csv_file_name(os.path.basename(path)))
+    except Exception as exc:
+        return path, "failed", str(exc) or exc.__class__.__name__
+    parsed.checksum = checksum
+    return path, "parsed", parsed
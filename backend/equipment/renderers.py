@@ -0,0 +1,155 @@
+from __future__ import annotations
+
+import datetime
+import json
+import uuid
+from itertools import islice
+from typing import Iterator
+
+from rest_framework.utils import encoders
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+
+from .columnar import ARROW_STREAM_MEDIA_TYPE, COLUMNAR_MEDIA_TYPE, to_arrow_table
+from .serializers import EquipmentDatasetSerializer
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speed-up
+    orjson = None
+
+_encoder = encoders.JSONEncoder()
+
+# orjson and the stdlib write every float in [1e-4, 1e16) (and 0.0) the same
+# way; outside that range they pick different notations (``1e16`` vs
+# ``1e+16``, ``0.00001`` vs ``1e-05``), and orjson writes NaN/Infinity as
+# ``null`` where DRF refuses to encode them. orjson also stops at 64-bit ints.
+_SAME_REPR_MIN, _SAME_REPR_MAX = 1e-4, 1e16
+_ORJSON_INT_MIN, _ORJSON_INT_MAX = -(2**63), 2**64 - 1
+_ORJSON_AS_DRF = (uuid.UUID, datetime.date, datetime.time)
+
+
+def _orjson_matches_drf(data) -> bool:
+    """
+    True when orjson would encode ``data`` exactly like DRF's encoder.
+    """
+
+    stack = [data]
+    while stack:
+        value = stack.pop()
+        kind = type(value)
+        if kind is str or value is None or kind is bool:
+            continue
+        if isinstance(value, float):
+            if value != 0.0 and not _SAME_REPR_MIN <= abs(value) < _SAME_REPR_MAX:
+                return False
+        elif isinstance(value, int):
+            if not _ORJSON_INT_MIN <= value <= _ORJSON_INT_MAX:
+                return False
+        elif isinstance(value, dict):
+            if not all(type(key) is str for key in value):
+                return False
+            stack.extend(value.values())
+        elif isinstance(value, (list, tuple)):
+            stack.extend(value)
+        elif isinstance(value, str):
+            continue
+        elif not isinstance(value, _ORJSON_AS_DRF):
+            return False
+    return True
+
+
+def dumps(data) -> bytes:
+    """
+    Compact UTF-8 JSON matching DRF's ``JSONRenderer`` output byte for byte.
+
+    orjson is used when every value in ``data`` is one it encodes the same
+    way; anything else (out-of-range floats, NaN, huge ints, unusual types)
+    goes through the stdlib encoder with DRF's settings, so NaN still raises.
+    """
+
+    if orjson is not None and _orjson_matches_drf(data):
+        # Datetimes go through DRF's encoder (``Z`` suffix, not ``+00:00``).
+        ret = orjson.dumps(data, default=_encoder.default, option=orjson.OPT_PASSTHROUGH_DATETIME)
+    else:
+        ret = json.dumps(
+            data,
+            cls=encoders.JSONEncoder,
+            ensure_ascii=False,
+            allow_nan=False,
+            separators=(",", ":"),
+        ).encode()
+    # DRF escapes these so the output stays a strict javascript subset.
+    if b"\xe2\x80\xa8" in ret or b"\xe2\x80\xa9" in ret:
+        ret = ret.replace(b"\xe2\x80\xa8", b"\\u2028").replace(b"\xe2\x80\xa9", b"\\u2029")
+    return ret
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    ``JSONRenderer`` backed by orjson when installed.
+
+    Indented output (``Accept: application/json; indent=4`` or the browsable
+    API) still goes through the stock renderer.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        if self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+        return dumps(data)
+
+
+class ColumnarJSONRenderer(FastJSONRenderer):
+    """
+    Dataset payloads with one array per column instead of one object per row.
+
+    The view decides the shape (see ``equipment.columnar``); this renderer
+    only advertises the media type for content negotiation.
+    """
+
+    media_type = COLUMNAR_MEDIA_TYPE
+    format = "columnar"
+
+
+class ArrowIPCRenderer(BaseRenderer):
+    """
+    Arrow IPC stream of a dataset's columns; dataset metadata (id, file name,
+    upload time, summary) rides along as JSON in the schema metadata.
+    """
+
+    media_type = ARROW_STREAM_MEDIA_TYPE
+    format = "arrow"
+    charset = None
+    render_style = "binary"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        import pyarrow as pa
+
+        metadata = None
+        if data.get("dataset") is not None:
+            metadata = {b"equipment.dataset": dumps(data["dataset"])}
+        table = to_arrow_table(data["columns"], metadata)
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        return sink.getvalue().to_pybytes()
+
+
+def stream_dataset_json(dataset, chunk_rows: int = 1000) -> Iterator[bytes]:
+    """
+    Encode a dataset like ``EquipmentDatasetDetailSerializer`` would, writing
+    the ``data`` array incrementally instead of materializing it.
+    """
+
+    head = dumps(EquipmentDatasetSerializer(dataset).data)
+    yield head[:-1] + b',"data":['
+    rows = dataset.iter_rows(chunk_size=chunk_rows)
+    separator = b""
+    while True:
+        chunk = list(islice(rows, chunk_rows))
+        if not chunk:
+            break
+        yield separator + b",".join(dumps(row) for row in chunk)
+        separator = b","
+    yield b"]}"
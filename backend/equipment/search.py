@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+from typing import List, Optional, Tuple
+
+from django.db import connections
+
+from .models import EquipmentDataset, EquipmentRecord
+
+SEARCH_TABLE = "equipment_record_search"
+MATCH_MODES = ("substring", "prefix")
+
+
+def _has_fts_index(using: str) -> bool:
+    connection = connections[using]
+    if connection.vendor != "sqlite":
+        return False
+    with connection.cursor() as cursor:
+        return SEARCH_TABLE in connection.introspection.table_names(cursor)
+
+
+def index_records(dataset, using: str = "default") -> None:
+    """
+    Add a freshly written dataset's rows to the SQLite search table in one
+    statement (other engines index through ordinary database indexes).
+    """
+
+    if not _has_fts_index(using):
+        return
+    connection = connections[using]
+    records = connection.ops.quote_name(EquipmentRecord._meta.db_table)
+    dataset_id = EquipmentRecord._meta.get_field("dataset").get_db_prep_value(
+        dataset.pk, connection
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {SEARCH_TABLE}(rowid, equipment_name, equipment_type) "
+            f"SELECT id, equipment_name, equipment_type FROM {records} WHERE dataset_id = %s",
+            [dataset_id],
+        )
+
+
+def _like_pattern(term: str, mode: str) -> str:
+    return f"{term}%" if mode == "prefix" else f"%{term}%"
+
+
+def _escape_like(term: str) -> str:
+    return term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _like_clauses(column: str, term: str, mode: str) -> Tuple[List[str], List[str]]:
+    """
+    SQL and params matching ``term`` literally. The trigram index only serves
+    a LIKE without ``ESCAPE``, so a term holding wildcards is probed as is and
+    then narrowed by an escaped LIKE on the same column.
+    """
+
+    clauses = [f"{column} LIKE %s"]
+    params = [_like_pattern(term, mode)]
+    escaped = _escape_like(term)
+    if escaped != term:
+        clauses.append(f"{column} LIKE %s ESCAPE '\\'")
+        params.append(_like_pattern(escaped, mode))
+    return clauses, params
+
+
+def _fts_candidate_ids(
+    name: Optional[str], equipment_type: Optional[str], mode: str, limit: int, using: str
+) -> List[int]:
+    connection = connections[using]
+    quote = connection.ops.quote_name
+    records = quote(EquipmentRecord._meta.db_table)
+    datasets = quote(EquipmentDataset._meta.db_table)
+    clauses, params = [], []
+    for column, term in (("search.equipment_name", name), ("search.equipment_type", equipment_type)):
+        if term:
+            column_clauses, column_params = _like_clauses(column, term, mode)
+            clauses.extend(column_clauses)
+            params.extend(column_params)
+    sql = (
+        f"SELECT search.rowid FROM {SEARCH_TABLE} AS search "
+        f"JOIN {records} AS record ON record.id = search.rowid "
+        f"JOIN {datasets} AS dataset ON dataset.id = record.dataset_id "
+        f"WHERE {' AND '.join(clauses)} "
+        "ORDER BY dataset.uploaded_at DESC, record.row_index LIMIT %s"
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [*params, limit])
+        return [row[0] for row in cursor.fetchall()]
+
+
+def search_records(
+    name: Optional[str] = None,
+    equipment_type: Optional[str] = None,
+    mode: str = "substring",
+    limit: int = 500,
+    using: str = "default",
+) -> List[EquipmentRecord]:
+    """
+    Find readings by equipment name and/or type across every retained upload,
+    newest upload first.
+
+    SQLite answers from the FTS5 trigram table (rows are indexed at ingest by
+    ``index_records`` and dropped by a delete trigger when a dataset is
+    pruned). PostgreSQL relies on the ``pg_trgm`` indexes behind
+    ``icontains``/``istartswith``.
+    """
+
+    queryset = EquipmentRecord.objects.using(using).select_related("dataset")
+    ordering = ("-dataset__uploaded_at", "row_index")
+    if _has_fts_index(using):
+        ids = _fts_candidate_ids(name, equipment_type, mode, limit, using)
+        return list(queryset.filter(id__in=ids).order_by(*ordering))
+
+    lookup = "istartswith" if mode == "prefix" else "icontains"
+    if name:
+        queryset = queryset.filter(**{f"equipment_name__{lookup}": name})
+    if equipment_type:
+        queryset = queryset.filter(**{f"equipment_type__{lookup}": equipment_type})
+    return list(queryset.order_by(*ordering)[:limit])
@@ -1,6 +1,6 @@
 from rest_framework import serializers
 
-from .models import EquipmentDataset
+from .models import DatasetEvent, EquipmentAnomaly, EquipmentDataset, EquipmentRecord
 
 
 class EquipmentDatasetSerializer(serializers.ModelSerializer):
@@ -10,6 +10,41 @@ class EquipmentDatasetSerializer(serializers.ModelSerializer):
 
 
 class EquipmentDatasetDetailSerializer(serializers.ModelSerializer):
+    data = serializers.SerializerMethodField()
+
     class Meta:
         model = EquipmentDataset
         fields = ("id", "file_name", "uploaded_at", "summary", "data")
+
+    def get_data(self, obj):
+        return list(obj.iter_rows())
+
+
+class EquipmentAnomalySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = EquipmentAnomaly
+        fields = ("row_index", "equipment_name", "equipment_type", "metric", "value", "score")
+
+
+class EquipmentReadingSerializer(serializers.ModelSerializer):
+    dataset_id = serializers.UUIDField(read_only=True)
+    file_name = serializers.CharField(source="dataset.file_name")
+    uploaded_at = serializers.DateTimeField(source="dataset.uploaded_at")
+
+    class Meta:
+        model = EquipmentRecord
+        fields = (
+            "dataset_id",
+            "file_name",
+            "uploaded_at",
+            "row_index",
+            "flowrate",
+            "pressure",
+            "temperature",
+        )
+
+
+class DatasetEventSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = DatasetEvent
+        fields = ("id", "kind", "dataset_id", "payload", "created_at")
@@ -38,6 +38,7 @@ def generate_pdf_report(dataset) -> BytesIO:
         ("Avg Flowrate", dataset.summary.get("avg_flowrate", 0)),
         ("Avg Pressure", dataset.summary.get("avg_pressure", 0)),
         ("Avg Temperature", dataset.summary.get("avg_temperature", 0)),
+        ("Anomalies", dataset.summary.get("anomaly_count", "n/a")),
     ]
     pdf.setFont("Helvetica", 12)
     for label, value in summary_pairs:
@@ -58,13 +59,13 @@ def generate_pdf_report(dataset) -> BytesIO:
             pdf.drawString(margin, y, f"{equipment_type}: {count}")
             y -= 18
 
-    if dataset.data:
+    sample_rows = list(dataset.iter_rows(limit=5))
+    if sample_rows:
         y -= 12
         pdf.setFont("Helvetica-Bold", 14)
         pdf.drawString(margin, y, "Sample Records")
         y -= 22
         pdf.setFont("Helvetica", 10)
-        sample_rows = dataset.data[:5]
         for row in sample_rows:
             row_text = ", ".join(f"{k}: {v}" for k, v in row.items())
             pdf.drawString(margin, y, row_text[:1000])
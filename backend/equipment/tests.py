@@ -1,8 +1,54 @@
+import datetime
+import gzip
+import io
+import json
+import multiprocessing
+import os
+import tempfile
+import time
+import unittest
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from decimal import Decimal
+from unittest import mock
+
 from django.contrib.auth import get_user_model
 from django.core.files.uploadedfile import SimpleUploadedFile
-from django.test import TestCase
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import LiveServerTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
 from rest_framework.test import APIClient
 
+from . import admission
+from .admission import (
+    UploadBudgetExhausted,
+    UploadReservation,
+    admit_upload,
+    estimate_upload_bytes,
+    in_flight_bytes,
+)
+from .ingest import (
+    BULK_WRITERS,
+    RECORD_FIELDS,
+    ORMBulkWriter,
+    PostgresCopyWriter,
+    get_bulk_writer,
+)
+from .columnar import ARROW_STREAM_MEDIA_TYPE, COLUMNAR_MEDIA_TYPE, arrow_available
+from .compression import zstd_available
+from .events import record_event
+from .exports import parquet_available
+from .management.commands.loadtest import Command as LoadTestCommand, percentile
+from .models import DatasetEvent, EquipmentDataset, EquipmentRecord
+from .parsing import init_import_worker, parse_file
+from .renderers import FastJSONRenderer
+from .serializers import EquipmentDatasetDetailSerializer
+
 SAMPLE_CSV = """Equipment Name,Type,Flowrate,Pressure,Temperature
 Pump A,Pump,100,50,300
 Pump B,Pump,150,60,310
@@ -27,6 +73,54 @@ class EquipmentAPITests(TestCase):
         data = self._upload()
         self.assertEqual(data["summary"]["total_equipment"], 3)
         self.assertAlmostEqual(data["summary"]["avg_flowrate"], 113.33, places=2)
+        self.assertEqual(
+            data["data"][0],
+            {
+                "Equipment Name": "Pump A",
+                "Type": "Pump",
+                "Flowrate": 100.0,
+                "Pressure": 50.0,
+                "Temperature": 300.0,
+            },
+        )
+        self.assertEqual(EquipmentRecord.objects.filter(dataset_id=data["id"]).count(), 3)
+
+    def test_extra_columns_and_integers_round_trip(self):
+        csv_text = "Equipment Name,Type,Location,Flowrate,Pressure,Temperature\n" + (
+            "Pump A,Pump,Bay 1,100,50.5,300\nPump B,Pump,,150,60.0,310\n"
+        )
+        upload = SimpleUploadedFile("extra.csv", csv_text.encode(), content_type="text/csv")
+        response = self.client.post("/api/upload/", {"file": upload}, format="multipart")
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertIn(
+            b'{"Equipment Name":"Pump A","Type":"Pump","Location":"Bay 1","Flowrate":100,'
+            b'"Pressure":50.5,"Temperature":300}',
+            response.content,
+        )
+        self.assertIsNone(response.json()["data"][1]["Location"])
+
+        dataset_id = response.json()["id"]
+        columnar = self.client.get(f"/api/datasets/{dataset_id}/", HTTP_ACCEPT=COLUMNAR_MEDIA_TYPE)
+        self.assertEqual(columnar.json()["data"]["values"]["Location"], ["Bay 1", None])
+        export = self.client.get(f"/api/datasets/{dataset_id}/export/?format=csv")
+        self.assertEqual(
+            b"".join(export.streaming_content).decode().splitlines()[:2],
+            [
+                "Equipment Name,Type,Location,Flowrate,Pressure,Temperature",
+                "Pump A,Pump,Bay 1,100,50.5,300",
+            ],
+        )
+        if arrow_available():
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            arrow = self.client.get(f"/api/datasets/{dataset_id}/", HTTP_ACCEPT=ARROW_STREAM_MEDIA_TYPE)
+            table = pa.ipc.open_stream(arrow.content).read_all()
+            self.assertEqual(table.to_pylist(), response.json()["data"])
+            self.assertEqual(table.schema.field("Flowrate").type, pa.int64())
+            parquet = self.client.get(f"/api/datasets/{dataset_id}/export/?format=parquet")
+            table = pq.read_table(io.BytesIO(b"".join(parquet.streaming_content)))
+            self.assertEqual(table.to_pylist(), response.json()["data"])
 
     def test_history_is_limited_to_five(self):
         for index in range(6):
@@ -34,3 +128,627 @@ class EquipmentAPITests(TestCase):
         history_response = self.client.get("/api/datasets/history/")
         self.assertEqual(history_response.status_code, 200)
         self.assertEqual(len(history_response.data), 5)
+
+    def test_fast_renderer_matches_drf_output(self):
+        data = self._upload()
+        dataset = EquipmentDataset.objects.get(pk=data["id"])
+        payload = EquipmentDatasetDetailSerializer(dataset).data
+        payload["file_name"] = "caf\u00e9\u2028.csv"
+        self.assertEqual(FastJSONRenderer().render(payload), JSONRenderer().render(payload))
+
+    def test_fast_renderer_matches_drf_where_orjson_differs(self):
+        payload = {
+            "floats": [1e16, 0.00001, 1e-7, -2.5e300, 0.0, 120.5],
+            "ints": [2**70, -(2**64), 300],
+            "at": datetime.datetime(2024, 1, 2, 3, 4, 5, tzinfo=datetime.timezone.utc),
+            "reading": Decimal("1.5"),
+        }
+        self.assertEqual(FastJSONRenderer().render(payload), JSONRenderer().render(payload))
+        for value in (float("nan"), float("inf")):
+            with self.assertRaises(ValueError):
+                JSONRenderer().render({"reading": value})
+            with self.assertRaises(ValueError):
+                FastJSONRenderer().render({"reading": value})
+
+    def test_latest_streams_large_datasets_byte_for_byte(self):
+        self._upload()
+        buffered = self.client.get("/api/datasets/latest/")
+        with override_settings(EQUIPMENT_STREAM_MIN_ROWS=0):
+            streamed = self.client.get("/api/datasets/latest/")
+        self.assertTrue(streamed.streaming)
+        self.assertEqual(b"".join(streamed.streaming_content), buffered.content)
+
+    def test_export_csv_projects_columns_and_filters_types(self):
+        data = self._upload()
+        response = self.client.get(
+            f"/api/datasets/{data['id']}/export/?format=csv&columns=Equipment Name,Flowrate&type=Pump"
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "text/csv")
+        body = b"".join(response.streaming_content).decode()
+        self.assertEqual(body, "Equipment Name,Flowrate\nPump A,100\nPump B,150\n")
+
+    def test_export_ndjson_streams_all_rows(self):
+        data = self._upload()
+        response = self.client.get(f"/api/datasets/{data['id']}/export/?format=ndjson")
+        lines = b"".join(response.streaming_content).splitlines()
+        self.assertEqual([json.loads(line) for line in lines], data["data"])
+
+    def test_export_rejects_unknown_format_and_column(self):
+        data = self._upload()
+        url = f"/api/datasets/{data['id']}/export/"
+        self.assertEqual(self.client.get(url + "?format=xlsx").status_code, 400)
+        self.assertEqual(self.client.get(url + "?columns=Color").status_code, 400)
+
+    @unittest.skipUnless(parquet_available(), "pyarrow is not installed")
+    def test_export_parquet_round_trips(self):
+        import pyarrow.parquet as pq
+
+        data = self._upload()
+        with override_settings(EQUIPMENT_EXPORT_CHUNK_ROWS=2):
+            response = self.client.get(f"/api/datasets/{data['id']}/export/?format=parquet")
+            body = b"".join(response.streaming_content)
+        parquet_file = pq.ParquetFile(io.BytesIO(body))
+        self.assertEqual(parquet_file.num_row_groups, 2)
+        self.assertEqual(parquet_file.read().to_pylist(), data["data"])
+
+    def test_anomalies_are_flagged_per_type(self):
+        rows = [f"Pump-{index},Pump,{100 + index},5.0,300" for index in range(8)]
+        rows.append("Pump-12,Pump,100,5.1,900")
+        rows += [f"Valve-{index},Valve,{20 + index},900,{50 + index}" for index in range(6)]
+        csv_text = "Equipment Name,Type,Flowrate,Pressure,Temperature\n" + "\n".join(rows)
+        upload = SimpleUploadedFile("anomalies.csv", csv_text.encode(), content_type="text/csv")
+        data = self.client.post("/api/upload/", {"file": upload}, format="multipart").data
+        self.assertEqual(data["summary"]["anomaly_count"], 1)
+
+        response = self.client.get(f"/api/datasets/{data['id']}/anomalies/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data), 1)
+        anomaly = response.data[0]
+        self.assertEqual(
+            (anomaly["row_index"], anomaly["equipment_name"], anomaly["metric"], anomaly["value"]),
+            (8, "Pump-12", "temperature", 900.0),
+        )
+        filtered = self.client.get(f"/api/datasets/{data['id']}/anomalies/?metric=pressure")
+        self.assertEqual(filtered.data, [])
+
+    def test_anomalies_in_a_group_without_spread(self):
+        rows = [f"Valve-{index},Valve,0.0,5,300" for index in range(9)]
+        rows.append("Valve-9,Valve,900.0,5,300")
+        csv_text = "Equipment Name,Type,Flowrate,Pressure,Temperature\n" + "\n".join(rows)
+        upload = SimpleUploadedFile("flat.csv", csv_text.encode(), content_type="text/csv")
+        data = self.client.post("/api/upload/", {"file": upload}, format="multipart").data
+        anomalies = self.client.get(f"/api/datasets/{data['id']}/anomalies/").data
+        self.assertEqual(
+            [(item["equipment_name"], item["metric"], item["score"]) for item in anomalies],
+            [("Valve-9", "flowrate", None)],
+        )
+
+    def test_search_returns_readings_per_upload(self):
+        first = self._upload(name="first.csv")
+        second = self._upload(name="second.csv")
+        response = self.client.get("/api/equipment/search/?name=pump b")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data), 1)
+        match = response.data[0]
+        self.assertEqual((match["equipment_name"], match["equipment_type"]), ("Pump B", "Pump"))
+        self.assertEqual(
+            [reading["dataset_id"] for reading in match["readings"]],
+            [second["id"], first["id"]],
+        )
+        self.assertEqual(match["readings"][0]["flowrate"], 150.0)
+
+        prefix = self.client.get("/api/equipment/search/?name=alve&match=prefix")
+        self.assertEqual(prefix.data, [])
+        by_type = self.client.get("/api/equipment/search/?type=valv&match=prefix")
+        self.assertEqual([item["equipment_name"] for item in by_type.data], ["Valve C"])
+        self.assertEqual(self.client.get("/api/equipment/search/").status_code, 400)
+
+    def test_search_treats_wildcards_literally(self):
+        header = "Equipment Name,Type,Flowrate,Pressure,Temperature\n"
+        uploads = [("old.csv", "Pump_1,Pump,1,1,1\n")]
+        uploads += [(f"new-{index}.csv", "PumpN1,Pump,1,1,1\n") for index in range(10)]
+        with override_settings(EQUIPMENT_HISTORY_LIMIT=20):
+            for name, rows in uploads:
+                upload = SimpleUploadedFile(name, (header + rows).encode(), content_type="text/csv")
+                self.client.post("/api/upload/", {"file": upload}, format="multipart")
+        response = self.client.get("/api/equipment/search/?name=Pump_1&limit=2")
+        self.assertEqual([item["equipment_name"] for item in response.data], ["Pump_1"])
+        response = self.client.get("/api/equipment/search/?name=p%25&match=prefix")
+        self.assertEqual(response.data, [])
+
+    def test_search_clamps_negative_limit(self):
+        self._upload()
+        response = self.client.get("/api/equipment/search/?name=P&limit=-1")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, [])
+        with mock.patch("equipment.search._has_fts_index", return_value=False):
+            response = self.client.get("/api/equipment/search/?name=P&limit=-1")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, [])
+
+    def test_search_index_follows_pruning(self):
+        for index in range(6):
+            self._upload(name=f"file-{index}.csv")
+        response = self.client.get("/api/equipment/search/?name=Valve C")
+        self.assertEqual(len(response.data[0]["readings"]), 5)
+        if connection.vendor == "sqlite":
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT count(*) FROM equipment_record_search")
+                self.assertEqual(cursor.fetchone()[0], EquipmentRecord.objects.count())
+
+    def test_change_feed_reports_created_and_pruned(self):
+        cursor = self.client.get("/api/changes/").data["cursor"]
+        uploads = [self._upload(name=f"file-{index}.csv") for index in range(6)]
+        response = self.client.get(f"/api/changes/?since={cursor}")
+        self.assertEqual(response.status_code, 200)
+        kinds = [event["kind"] for event in response.data["events"]]
+        self.assertEqual(kinds.count("dataset.created"), 6)
+        self.assertEqual(kinds[-1], "dataset.pruned")
+        self.assertEqual(response.data["events"][-1]["dataset_id"], uploads[0]["id"])
+        self.assertEqual(response.data["events"][0]["payload"]["file_name"], "file-0.csv")
+
+        latest = self.client.get(f"/api/changes/?since={response.data['cursor']}")
+        self.assertEqual(latest.data["events"], [])
+
+    @override_settings(EQUIPMENT_EVENT_STREAM_SECONDS=0)
+    def test_change_stream_resumes_from_last_event_id(self):
+        cursor = self.client.get("/api/changes/").data["cursor"]
+        upload = self._upload()
+        response = self.client.get(
+            "/api/changes/stream/", HTTP_LAST_EVENT_ID=str(cursor), HTTP_ACCEPT="text/event-stream"
+        )
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        body = b"".join(response.streaming_content).decode()
+        self.assertIn("event: dataset.created\n", body)
+        self.assertIn(upload["id"], body)
+
+    @override_settings(EQUIPMENT_EVENT_MAX_STREAMS=1)
+    def test_change_streams_are_capped_per_process(self):
+        first = self.client.get("/api/changes/stream/", HTTP_ACCEPT="text/event-stream")
+        self.assertEqual(first.status_code, 200)
+        second = self.client.get("/api/changes/stream/", HTTP_ACCEPT="text/event-stream")
+        self.assertEqual(second.status_code, 503)
+        self.assertIn("Retry-After", second)
+        first.close()
+        third = self.client.get("/api/changes/stream/", HTTP_ACCEPT="text/event-stream")
+        self.assertEqual(third.status_code, 200)
+        third.close()
+
+    def test_old_events_are_pruned_with_history(self):
+        old = record_event(DatasetEvent.JOB_FINISHED)
+        DatasetEvent.objects.filter(pk=old.pk).update(
+            created_at=timezone.now() - datetime.timedelta(days=30)
+        )
+        upload = self._upload()
+        self.assertFalse(DatasetEvent.objects.filter(pk=old.pk).exists())
+        self.assertTrue(DatasetEvent.objects.filter(dataset_id=upload["id"]).exists())
+
+    def test_detail_negotiates_columnar_json(self):
+        data = self._upload()
+        response = self.client.get(f"/api/datasets/{data['id']}/", HTTP_ACCEPT=COLUMNAR_MEDIA_TYPE)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], COLUMNAR_MEDIA_TYPE)
+        payload = json.loads(response.content)
+        self.assertEqual(payload["summary"], data["summary"])
+        self.assertEqual(payload["data"]["length"], 3)
+        self.assertEqual(payload["data"]["values"]["Flowrate"], [100.0, 150.0, 90.0])
+        self.assertEqual(
+            payload["data"]["values"]["Type"], {"dictionary": ["Pump", "Valve"], "indices": [0, 0, 1]}
+        )
+        plain = self.client.get(f"/api/datasets/{data['id']}/")
+        self.assertEqual(plain.json(), data)
+
+    def test_records_window_in_every_format(self):
+        data = self._upload()
+        url = f"/api/datasets/{data['id']}/records/?offset=1&limit=1"
+        self.assertEqual(self.client.get(url).json(), data["data"][1:2])
+        columnar = self.client.get(url, HTTP_ACCEPT=COLUMNAR_MEDIA_TYPE)
+        self.assertEqual(columnar.json()["values"]["Equipment Name"], ["Pump B"])
+        self.assertEqual(columnar["X-Total-Count"], "3")
+        self.assertEqual(
+            columnar["Link"],
+            f'<http://testserver/api/datasets/{data["id"]}/records/?limit=1&offset=2>; rel="next"',
+        )
+        last_page = self.client.get(f"/api/datasets/{data['id']}/records/?offset=2&limit=1")
+        self.assertEqual(last_page["X-Total-Count"], "3")
+        self.assertNotIn("Link", last_page)
+
+    def test_desktop_accept_header_prefers_arrow(self):
+        data = self._upload()
+        # Sent verbatim by desktop/main.py when pyarrow is installed there.
+        accept = f"{ARROW_STREAM_MEDIA_TYPE}, {COLUMNAR_MEDIA_TYPE};q=0.9"
+        response = self.client.get(f"/api/datasets/{data['id']}/", HTTP_ACCEPT=accept)
+        expected = ARROW_STREAM_MEDIA_TYPE if arrow_available() else COLUMNAR_MEDIA_TYPE
+        self.assertEqual(response["Content-Type"], expected)
+        plain = self.client.get(f"/api/datasets/{data['id']}/", HTTP_ACCEPT="*/*")
+        self.assertEqual(plain["Content-Type"], "application/json")
+
+    @unittest.skipUnless(arrow_available(), "pyarrow is not installed")
+    def test_detail_negotiates_arrow_ipc(self):
+        import pyarrow as pa
+
+        data = self._upload()
+        response = self.client.get(f"/api/datasets/{data['id']}/", HTTP_ACCEPT=ARROW_STREAM_MEDIA_TYPE)
+        self.assertEqual(response["Content-Type"], ARROW_STREAM_MEDIA_TYPE)
+        table = pa.ipc.open_stream(response.content).read_all()
+        self.assertEqual(table.to_pylist(), data["data"])
+        self.assertEqual(json.loads(table.schema.metadata[b"equipment.dataset"])["id"], data["id"])
+
+        missing = self.client.get(
+            "/api/datasets/00000000-0000-0000-0000-000000000000/", HTTP_ACCEPT=ARROW_STREAM_MEDIA_TYPE
+        )
+        self.assertEqual(missing.status_code, 404)
+        self.assertEqual(missing["Content-Type"], "application/json")
+
+
+class CompressedUploadTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(
+            user=get_user_model().objects.create_user(username="tester", password="secret")
+        )
+
+    def _post_file(self, name, payload):
+        upload = SimpleUploadedFile(name, payload, content_type="application/octet-stream")
+        return self.client.post("/api/upload/", {"file": upload}, format="multipart")
+
+    def _zip(self, *names):
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+            for name in names:
+                archive.writestr(name, SAMPLE_CSV)
+        return buffer.getvalue()
+
+    def test_gzip_upload_is_detected_by_extension_and_magic(self):
+        payload = gzip.compress(SAMPLE_CSV.encode())
+        for name in ("readings.csv.gz", "readings.bin"):
+            response = self._post_file(name, payload)
+            self.assertEqual(response.status_code, 201, response.content)
+            self.assertEqual(response.data["summary"]["total_equipment"], 3)
+        self.assertEqual(response.data["file_name"], "readings.bin")
+        self.assertEqual(
+            EquipmentDataset.objects.order_by("uploaded_at").first().file_name, "readings.csv"
+        )
+
+    def test_zip_upload_needs_exactly_one_entry(self):
+        response = self._post_file("export.zip", self._zip("export.csv"))
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(response.data["file_name"], "export.csv")
+        response = self._post_file("export.zip", self._zip("a.csv", "b.csv"))
+        self.assertEqual(response.status_code, 400)
+
+    @unittest.skipUnless(zstd_available(), "zstandard is not installed")
+    def test_zstd_upload(self):
+        import zstandard
+
+        payload = zstandard.ZstdCompressor().compress(SAMPLE_CSV.encode())
+        self.assertEqual(self._post_file("readings.csv.zst", payload).status_code, 201)
+
+    def test_raw_body_with_content_encoding(self):
+        response = self.client.post(
+            "/api/upload/",
+            gzip.compress(SAMPLE_CSV.encode()),
+            content_type="text/csv",
+            HTTP_CONTENT_ENCODING="gzip",
+            HTTP_CONTENT_DISPOSITION='attachment; filename="site-7.csv"',
+        )
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(response.data["file_name"], "site-7.csv")
+        self.assertEqual(response.data["data"][2]["Equipment Name"], "Valve C")
+
+        response = self.client.post(
+            "/api/upload/", SAMPLE_CSV.encode(), content_type="text/csv", HTTP_CONTENT_ENCODING="br"
+        )
+        self.assertEqual(response.status_code, 415)
+
+    @override_settings(EQUIPMENT_UPLOAD_MAX_DECOMPRESSED_BYTES=64)
+    def test_decompressed_size_is_capped(self):
+        response = self._post_file("readings.csv.gz", gzip.compress(SAMPLE_CSV.encode()))
+        self.assertEqual(response.status_code, 413)
+        self.assertFalse(EquipmentDataset.objects.exists())
+
+
+class RecordMigrationTests(TransactionTestCase):
+    def test_backfill_keeps_every_column_and_integer_values(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate([("equipment", "0001_initial")])
+        apps = executor.loader.project_state([("equipment", "0001_initial")]).apps
+        rows = [
+            {
+                "Equipment Name": "Pump A",
+                "Type": "Pump",
+                "Flowrate": 100,
+                "Pressure": 5.5,
+                "Temperature": 300,
+                "Location": "Bay 1",
+            },
+        ]
+        old = apps.get_model("equipment", "EquipmentDataset").objects.create(
+            file_name="old.csv", summary={}, data=rows
+        )
+
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(executor.loader.graph.leaf_nodes("equipment"))
+        dataset = EquipmentDataset.objects.get(pk=old.pk)
+        self.assertEqual(list(dataset.iter_rows()), rows)
+        self.assertEqual(type(next(dataset.iter_rows())["Flowrate"]), int)
+
+
+class UploadAdmissionTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(
+            user=get_user_model().objects.create_user(username="tester", password="secret")
+        )
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        ledger = override_settings(
+            EQUIPMENT_UPLOAD_LEDGER=os.path.join(directory.name, "budget.json"),
+            EQUIPMENT_UPLOAD_QUEUE_SECONDS=0.2,
+        )
+        ledger.enable()
+        self.addCleanup(ledger.disable)
+
+    def _post(self):
+        upload = SimpleUploadedFile("sample.csv", SAMPLE_CSV.encode("utf-8"), content_type="text/csv")
+        return self.client.post("/api/upload/", {"file": upload}, format="multipart")
+
+    def test_reservation_is_released_after_upload(self):
+        self.assertEqual(self._post().status_code, 201)
+        self.assertEqual(in_flight_bytes(), 0)
+
+    def test_upload_that_can_never_fit_is_rejected(self):
+        with override_settings(EQUIPMENT_UPLOAD_MEMORY_BUDGET=1024):
+            response = self._post()
+        self.assertEqual(response.status_code, 413)
+        self.assertFalse(EquipmentDataset.objects.exists())
+
+    def test_growing_reservation_doubles_in_one_ledger_entry(self):
+        reservation = UploadReservation(budget=2**30, queue_seconds=0)
+        with mock.patch("equipment.admission._try_reserve", wraps=admission._try_reserve) as reserve:
+            reservation.cover(64 * 1024)
+            for length in range(65 * 1024, 11 * 2**20, 64 * 1024):
+                reservation.cover(length)
+            self.assertLessEqual(reserve.call_count, 9)
+        with admission._locked_ledger() as ledger:
+            self.assertEqual(len(ledger), 1)
+        self.assertEqual(in_flight_bytes(), reservation.cost)
+        reservation.release()
+        self.assertEqual(in_flight_bytes(), 0)
+
+    def test_only_one_growing_upload_waits(self):
+        budget = estimate_upload_bytes(4096) * 2
+        first = UploadReservation(budget, queue_seconds=0)
+        second = UploadReservation(budget, queue_seconds=0)
+        self.addCleanup(first.release)
+        self.addCleanup(second.release)
+        first.cover(4096)
+        second.cover(4096)
+        # The first grower is left waiting; a second one would deadlock with it.
+        self.assertIsNone(admission._try_reserve(budget, budget, first._token))
+        with self.assertRaises(UploadBudgetExhausted):
+            second.cover(8192)
+
+    def test_full_budget_queues_then_returns_503(self):
+        budget = estimate_upload_bytes(4096) * 2
+        with override_settings(EQUIPMENT_UPLOAD_MEMORY_BUDGET=budget):
+            with admit_upload(4096 * 2):
+                started = time.perf_counter()
+                response = self._post()
+                waited = time.perf_counter() - started
+            self.assertEqual(response.status_code, 503)
+            self.assertEqual(response["Retry-After"], "1")
+            self.assertGreaterEqual(waited, 0.2)
+            self.assertEqual(self._post().status_code, 201)
+
+
+class TokenAuthTests(TestCase):
+    def setUp(self):
+        get_user_model().objects.create_user(username="tester", password="secret")
+        self.client = APIClient()
+
+    def _login(self):
+        response = self.client.post(
+            "/api/auth/token/", {"username": "tester", "password": "secret"}, format="json"
+        )
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.data["token"]
+
+    def test_login_rejects_bad_password(self):
+        response = self.client.post(
+            "/api/auth/token/", {"username": "tester", "password": "nope"}, format="json"
+        )
+        self.assertEqual(response.status_code, 400)
+
+    def test_token_is_verified_with_one_query(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self._login()}")
+        # The token/user lookup plus the history query itself.
+        with self.assertNumQueries(2):
+            self.assertEqual(self.client.get("/api/datasets/history/").status_code, 200)
+
+    def test_deactivated_user_token_is_rejected(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self._login()}")
+        self.assertEqual(self.client.get("/api/datasets/history/").status_code, 200)
+        get_user_model().objects.filter(username="tester").update(is_active=False)
+        self.assertEqual(self.client.get("/api/datasets/history/").status_code, 401)
+
+    def test_logout_revokes_token(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self._login()}")
+        self.assertEqual(self.client.get("/api/datasets/history/").status_code, 200)
+        self.assertEqual(self.client.delete("/api/auth/token/").status_code, 204)
+        self.assertEqual(self.client.get("/api/datasets/history/").status_code, 401)
+
+
+class BulkWriterTests(TestCase):
+    ROWS = 12000
+
+    def _dataset(self):
+        return EquipmentDataset.objects.create(
+            file_name="bulk.csv",
+            summary={},
+            columns=["Equipment Name", "Type", "Flowrate", "Pressure", "Temperature"],
+        )
+
+    def _rows(self):
+        return ((index, f"Pump-{index}", "", 100.0, 5.5, 300.0, {}) for index in range(self.ROWS))
+
+    def _write(self, writer):
+        dataset = self._dataset()
+        with CaptureQueriesContext(connection) as queries:
+            written = writer.write(
+                EquipmentRecord, RECORD_FIELDS, self._rows(), extra={"dataset": dataset.pk}
+            )
+        self.assertEqual(written, self.ROWS)
+        self.assertEqual(dataset.records.count(), self.ROWS)
+        self.assertEqual(dataset.records.filter(equipment_type="").count(), self.ROWS)
+        return [query for query in queries.captured_queries if "INSERT" in query["sql"]]
+
+    def test_writer_is_selected_from_engine(self):
+        self.assertIsInstance(get_bulk_writer(), BULK_WRITERS[connection.vendor])
+
+    def test_engine_writer_sends_one_statement_per_batch(self):
+        writer = get_bulk_writer()
+        inserts = self._write(writer)
+        self.assertEqual(len(inserts), -(-self.ROWS // writer.batch_size))
+        self.assertLess(len(inserts), len(self._write(ORMBulkWriter())))
+
+    def test_writers_store_json_and_foreign_keys_alike(self):
+        for writer in (get_bulk_writer(), ORMBulkWriter()):
+            dataset = self._dataset()
+            writer.write(
+                EquipmentRecord,
+                RECORD_FIELDS,
+                [(0, "Pump A", "Pump", 1.0, 2.0, 3.0, {"Location": "Bay 1", "Serial": 7})],
+                extra={"dataset": dataset.pk},
+            )
+            self.assertEqual(dataset.records.get().extra, {"Location": "Bay 1", "Serial": 7})
+
+    def test_copy_text_keeps_empty_strings_apart_from_null(self):
+        class RawCursor:
+            def copy_expert(self, sql, file):
+                self.sql, self.payload = sql, file.read()
+
+        raw_cursor = RawCursor()
+        PostgresCopyWriter().copy_rows(
+            raw_cursor, "records (a, b, c, d)", [("", None, 1.5, "tab\there\\n")]
+        )
+        self.assertEqual(raw_cursor.sql, "COPY records (a, b, c, d) FROM STDIN")
+        self.assertEqual(raw_cursor.payload, "\t\\N\t1.5\ttab\\there\\\\n\n")
+
+
+class ImportDatasetsCommandTests(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        files = {
+            "2023-01.csv": SAMPLE_CSV.encode(),
+            "2023-02.csv.gz": gzip.compress(SAMPLE_CSV.replace("Pump A", "Pump Z").encode()),
+            "2023-03.csv": b"Equipment Name,Type\nPump A,Pump\n",
+        }
+        for offset, (name, payload) in enumerate(files.items()):
+            path = os.path.join(self.directory, name)
+            with open(path, "wb") as handle:
+                handle.write(payload)
+            os.utime(path, (1_700_000_000 + offset, 1_700_000_000 + offset))
+
+    def _import(self, *args):
+        out, err = io.StringIO(), io.StringIO()
+        call_command("import_datasets", self.directory, *args, stdout=out, stderr=err)
+        return out.getvalue(), err.getvalue()
+
+    def test_imports_in_parallel_and_skips_known_files(self):
+        out, err = self._import("--workers", "2", "--batch-size", "1")
+        self.assertIn("Imported 2 of 3 files (0 skipped, 1 failed", out)
+        self.assertIn("2023-03.csv: CSV is missing required columns", err)
+        latest = EquipmentDataset.objects.order_by("-uploaded_at").first()
+        self.assertEqual(latest.file_name, "2023-02.csv")
+        self.assertEqual(latest.records.first().equipment_name, "Pump Z")
+        self.assertEqual(len(latest.checksum), 64)
+
+        out, _ = self._import("--workers", "0")
+        self.assertIn("Imported 0 of 3 files (2 skipped, 1 failed", out)
+        self.assertEqual(EquipmentDataset.objects.count(), 2)
+        finished = DatasetEvent.objects.filter(kind=DatasetEvent.JOB_FINISHED).last()
+        self.assertEqual(finished.payload["skipped"], 2)
+
+    def test_parser_runs_in_spawned_workers(self):
+        # "spawn" (macOS, Windows) starts workers without Django set up.
+        context = multiprocessing.get_context("spawn")
+        path = os.path.join(self.directory, "2023-02.csv.gz")
+        with ProcessPoolExecutor(
+            max_workers=1,
+            mp_context=context,
+            initializer=init_import_worker,
+            initargs=(frozenset(),),
+        ) as pool:
+            _, status, parsed = pool.submit(parse_file, path).result()
+        self.assertEqual(status, "parsed")
+        self.assertEqual(parsed.file_name, "2023-02.csv")
+        self.assertEqual(len(parsed.checksum), 64)
+
+    def test_unreadable_file_counts_as_failed(self):
+        os.mkdir(os.path.join(self.directory, "2023-04.csv"))
+        out, err = self._import("--workers", "2")
+        self.assertIn("Imported 2 of 4 files (0 skipped, 2 failed", out)
+        self.assertIn("2023-04.csv: ", err)
+
+    @override_settings(EQUIPMENT_HISTORY_LIMIT=1)
+    def test_keeps_everything_unless_asked_to_prune(self):
+        out, _ = self._import("--workers", "0")
+        self.assertIn("0 pruned", out)
+        self.assertEqual(EquipmentDataset.objects.count(), 2)
+
+    @override_settings(EQUIPMENT_HISTORY_LIMIT=1)
+    def test_prunes_once_to_history_limit(self):
+        out, _ = self._import("--workers", "0", "--prune")
+        self.assertIn("1 pruned", out)
+        self.assertEqual(
+            list(EquipmentDataset.objects.values_list("file_name", flat=True)), ["2023-02.csv"]
+        )
+
+
+class LoadTestCommandTests(LiveServerTestCase):
+    def test_percentile_uses_nearest_rank(self):
+        samples = list(range(1, 101))
+        self.assertEqual(percentile(samples, 0.5), 50)
+        self.assertEqual(percentile(samples, 0.99), 99)
+        self.assertEqual(percentile([], 0.5), 0.0)
+
+    def test_reports_per_endpoint_latency_against_live_server(self):
+        call_command("create_demo_user", stdout=io.StringIO())
+        out = io.StringIO()
+        call_command(
+            "loadtest",
+            base_url=f"{self.live_server_url}/api",
+            concurrency=1,
+            duration=1,
+            mix="history=1,latest=1,upload=1,pdf=1",
+            upload_rows="20",
+            json=True,
+            stdout=out,
+        )
+        report = json.loads(out.getvalue())
+        self.assertGreater(report["requests"], 0)
+        self.assertEqual(report["error_rate"], 0.0)
+        self.assertIn("history", report["endpoints"])
+
+    def test_crashed_clients_are_reported(self):
+        call_command("create_demo_user", stdout=io.StringIO())
+        out = io.StringIO()
+        with mock.patch.object(LoadTestCommand, "_upload", side_effect=KeyError("id")):
+            with self.assertRaisesMessage(CommandError, "1 of 1 simulated clients crashed"):
+                call_command(
+                    "loadtest",
+                    base_url=f"{self.live_server_url}/api",
+                    concurrency=1,
+                    duration=1,
+                    mix="upload=1",
+                    upload_rows="20",
+                    json=True,
+                    stdout=out,
+                    stderr=io.StringIO(),
+                )
+        self.assertEqual(json.loads(out.getvalue())["crashed_clients"], ["KeyError: 'id'"])
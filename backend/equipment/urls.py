@@ -1,17 +1,33 @@
 from django.urls import path
 
 from .views import (
+    AuthTokenView,
+    ChangeFeedView,
+    ChangeStreamView,
+    DatasetAnomalyView,
+    DatasetDetailView,
+    DatasetExportView,
     DatasetHistoryView,
     DatasetPDFView,
+    DatasetRecordsView,
     DatasetUploadView,
+    EquipmentSearchView,
     LatestDatasetView,
     health_check,
 )
 
 urlpatterns = [
     path("health/", health_check, name="health-check"),
+    path("auth/token/", AuthTokenView.as_view(), name="auth-token"),
     path("upload/", DatasetUploadView.as_view(), name="dataset-upload"),
     path("datasets/latest/", LatestDatasetView.as_view(), name="dataset-latest"),
     path("datasets/history/", DatasetHistoryView.as_view(), name="dataset-history"),
+    path("changes/", ChangeFeedView.as_view(), name="change-feed"),
+    path("changes/stream/", ChangeStreamView.as_view(), name="change-stream"),
+    path("equipment/search/", EquipmentSearchView.as_view(), name="equipment-search"),
+    path("datasets/<uuid:pk>/", DatasetDetailView.as_view(), name="dataset-detail"),
+    path("datasets/<uuid:pk>/records/", DatasetRecordsView.as_view(), name="dataset-records"),
     path("datasets/<uuid:pk>/pdf/", DatasetPDFView.as_view(), name="dataset-pdf"),
+    path("datasets/<uuid:pk>/anomalies/", DatasetAnomalyView.as_view(), name="dataset-anomalies"),
+    path("datasets/<uuid:pk>/export/", DatasetExportView.as_view(), name="dataset-export"),
 ]
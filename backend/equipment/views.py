@@ -1,32 +1,118 @@
 from __future__ import annotations
 
-from typing import Dict
+import math
+import os
+import shutil
+import tempfile
 
-import pandas as pd
-from django.http import HttpResponse
+from django.conf import settings
+from django.db import transaction
+from django.http import HttpResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
+from django.utils.http import parse_header_parameters
+from django.utils.text import slugify
 from rest_framework import generics, status
+from rest_framework.authtoken.models import Token
+from rest_framework.authtoken.views import ObtainAuthToken
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.parsers import FormParser, MultiPartParser
 from rest_framework.permissions import AllowAny
+from rest_framework.renderers import BrowsableAPIRenderer
 from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
 from rest_framework.views import APIView
 
-from .models import EquipmentDataset
+from .admission import UploadBudgetExhausted, UploadTooLarge, admit_upload
+from .columnar import arrow_available, columnar_payload, columns_to_rows, dataset_columns
+from .compression import (
+    UnsupportedCompression,
+    compression_from_encoding,
+    compression_from_name,
+    csv_file_name,
+    expected_csv_bytes,
+    open_csv,
+    sniff_compression,
+)
+from .events import EventStream, current_cursor, events_since
+from .exports import (
+    EXPORT_FORMATS,
+    export_rows,
+    iter_csv,
+    iter_ndjson,
+    iter_parquet,
+    parquet_available,
+    resolve_columns,
+)
+from .ingest import prune_history, store_dataset
+from .models import EquipmentAnomaly, EquipmentDataset
+from .parsing import parse_csv
+from .renderers import (
+    ArrowIPCRenderer,
+    ColumnarJSONRenderer,
+    FastJSONRenderer,
+    stream_dataset_json,
+)
 from .serializers import (
+    DatasetEventSerializer,
+    EquipmentAnomalySerializer,
     EquipmentDatasetDetailSerializer,
     EquipmentDatasetSerializer,
+    EquipmentReadingSerializer,
 )
+from .search import MATCH_MODES, search_records
 from .services import generate_pdf_report, pdf_filename
 
 
-REQUIRED_COLUMNS = {
-    "equipment name": "Equipment Name",
-    "type": "Type",
-    "flowrate": "Flowrate",
-    "pressure": "Pressure",
-    "temperature": "Temperature",
-}
+# DRF ignores q-values between media types of equal precedence and takes the
+# first renderer that matches, so Arrow must come before columnar JSON for
+# "arrow, columnar;q=0.9" (the desktop client's Accept) to pick Arrow.
+DATASET_RENDERERS = [FastJSONRenderer]
+if arrow_available():
+    DATASET_RENDERERS.append(ArrowIPCRenderer)
+DATASET_RENDERERS += [ColumnarJSONRenderer, BrowsableAPIRenderer]
+
+
+class DatasetPayloadMixin:
+    """
+    Negotiates row JSON, columnar JSON or Arrow IPC for dataset payloads.
+    Errors always go out as JSON, whichever format was accepted.
+    """
+
+    renderer_classes = DATASET_RENDERERS
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        if (
+            isinstance(response, Response)
+            and response.status_code >= 400
+            and getattr(request, "accepted_renderer", None) is not None
+            and request.accepted_renderer.format == "arrow"
+        ):
+            request.accepted_renderer = FastJSONRenderer()
+            request.accepted_media_type = FastJSONRenderer.media_type
+        return super().finalize_response(request, response, *args, **kwargs)
+
+
+def dataset_detail_response(request, dataset, status_code=status.HTTP_200_OK):
+    """
+    Serialize a dataset with its rows in the negotiated shape. Plain JSON for
+    large uploads streams the ``data`` array instead of buffering it.
+    """
+
+    output_format = request.accepted_renderer.format
+    if output_format in ("columnar", "arrow"):
+        meta = EquipmentDatasetSerializer(dataset).data
+        columns = dataset_columns(dataset)
+        if output_format == "arrow":
+            return Response({"dataset": meta, "columns": columns}, status=status_code)
+        return Response({**meta, "data": columnar_payload(columns)}, status=status_code)
+
+    rows = dataset.summary.get("total_equipment", 0)
+    if rows > settings.EQUIPMENT_STREAM_MIN_ROWS and output_format == "json":
+        return StreamingHttpResponse(
+            stream_dataset_json(dataset), status=status_code, content_type="application/json"
+        )
+    serializer = EquipmentDatasetDetailSerializer(dataset)
+    return Response(serializer.data, status=status_code)
 
 
 @api_view(["GET"])
@@ -35,19 +121,114 @@ def health_check(request):
     return Response({"status": "ok"})
 
 
-class DatasetUploadView(APIView):
+class AuthTokenView(ObtainAuthToken):
+    """
+    ``POST`` credentials once to receive an API token; ``DELETE`` revokes it.
+    """
+
+    renderer_classes = APIView.renderer_classes
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        user = serializer.validated_data["user"]
+        token, _ = Token.objects.get_or_create(user=user)
+        return Response({"token": token.key, "username": user.get_username()})
+
+    def delete(self, request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return Response(
+                {"detail": "Authentication credentials were not provided."},
+                status=status.HTTP_401_UNAUTHORIZED,
+            )
+        Token.objects.filter(user=request.user).delete()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class DatasetUploadView(DatasetPayloadMixin, APIView):
+    """
+    Accepts a CSV either as the ``file`` field of a multipart form or as the
+    raw request body. The CSV may be gzip, zstd or single-entry ZIP
+    compressed (by file extension or magic number), and raw bodies may also
+    declare ``Content-Encoding: gzip|zstd``. Decompression streams straight
+    into the CSV parser.
+    """
+
     parser_classes = (MultiPartParser, FormParser)
 
     def post(self, request, *args, **kwargs):
-        upload = request.FILES.get("file")
-        if not upload:
+        # Admission is decided from the headers alone, before the body is
+        # read: request.FILES would already spool and parse it.
+        try:
+            content_length = int(request.META.get("CONTENT_LENGTH") or 0)
+        except ValueError:
+            content_length = 0
+        if content_length <= 0:
             return Response(
-                {"detail": "CSV file is required with field name 'file'."},
-                status=status.HTTP_400_BAD_REQUEST,
+                {"detail": "Content-Length header is required for uploads."},
+                status=status.HTTP_411_LENGTH_REQUIRED,
             )
+        try:
+            encoding = compression_from_encoding(request.META.get("HTTP_CONTENT_ENCODING", ""))
+        except UnsupportedCompression as exc:
+            return Response({"detail": str(exc)}, status=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE)
 
         try:
-            dataset = self._create_dataset(upload)
+            with admit_upload(expected_csv_bytes(content_length, encoding)) as reservation:
+                return self._handle_upload(request, reservation, encoding, content_length)
+        except UploadTooLarge as exc:
+            return Response(
+                {"detail": str(exc)}, status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+            )
+        except UploadBudgetExhausted as exc:
+            return Response(
+                {"detail": str(exc)},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+                headers={"Retry-After": str(exc.retry_after)},
+            )
+
+    def _handle_upload(self, request, reservation, encoding, content_length):
+        if request.content_type.startswith(("multipart/form-data", "application/x-www-form-urlencoded")):
+            if encoding:
+                return Response(
+                    {"detail": "Content-Encoding is only supported for raw CSV request bodies."},
+                    status=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+                )
+            upload = request.FILES.get("file")
+            if not upload:
+                return Response(
+                    {"detail": "CSV file is required with field name 'file'."},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+            file_name, size = upload.name, upload.size
+            compression = compression_from_name(file_name) or sniff_compression(upload)
+            source = upload
+        else:
+            file_name, size = self._raw_file_name(request), content_length
+            compression = encoding or compression_from_name(file_name)
+            source = request.stream
+            if compression == "zip":
+                # ZIP central directories sit at the end; spool (to disk once
+                # large) so the archive can be seeked.
+                source = tempfile.SpooledTemporaryFile(max_size=settings.FILE_UPLOAD_MAX_MEMORY_SIZE)
+                shutil.copyfileobj(request.stream, source)
+                source.seek(0)
+        if compression and not encoding:
+            reservation.cover(expected_csv_bytes(size, compression))
+
+        def on_read(total):
+            limit = settings.EQUIPMENT_UPLOAD_MAX_DECOMPRESSED_BYTES
+            if compression and limit and total > limit:
+                raise UploadTooLarge(f"Decompressed upload exceeds {limit // 2**20} MiB.")
+            reservation.cover(total)
+
+        try:
+            stream = open_csv(source, compression, on_read)
+            dataset = self._create_dataset(stream, csv_file_name(file_name))
+        except (UploadTooLarge, UploadBudgetExhausted):
+            raise
+        except UnsupportedCompression as exc:
+            return Response({"detail": str(exc)}, status=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE)
         except ValueError as exc:
             return Response({"detail": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
         except Exception as exc:  # pragma: no cover - defensive
@@ -56,69 +237,25 @@ class DatasetUploadView(APIView):
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        serializer = EquipmentDatasetDetailSerializer(dataset)
-        return Response(serializer.data, status=status.HTTP_201_CREATED)
-
-    def _create_dataset(self, upload) -> EquipmentDataset:
-        data_frame = pd.read_csv(upload)
-        column_lookup = self._build_column_lookup(data_frame.columns)
-        self._validate_columns(column_lookup)
-
-        numeric_columns = [
-            column_lookup["flowrate"],
-            column_lookup["pressure"],
-            column_lookup["temperature"],
-        ]
-        for column in numeric_columns:
-            data_frame[column] = pd.to_numeric(data_frame[column], errors="coerce")
-
-        if data_frame[numeric_columns].isnull().any().any():
-            raise ValueError("Numeric columns contain invalid values that cannot be parsed.")
+        return dataset_detail_response(request, dataset, status.HTTP_201_CREATED)
 
-        summary = self._build_summary(data_frame, column_lookup)
-        records = data_frame.to_dict(orient="records")
+    def _raw_file_name(self, request) -> str:
+        disposition = request.META.get("HTTP_CONTENT_DISPOSITION", "")
+        if disposition:
+            _, params = parse_header_parameters(disposition)
+            if params.get("filename"):
+                return os.path.basename(params["filename"])
+        return "upload.csv"
 
-        dataset = EquipmentDataset.objects.create(
-            file_name=upload.name,
-            summary=summary,
-            data=records,
-        )
-        self._prune_history()
+    def _create_dataset(self, stream, file_name: str) -> EquipmentDataset:
+        parsed = parse_csv(stream, file_name)
+        with transaction.atomic():
+            dataset = store_dataset(parsed)
+            prune_history()
         return dataset
 
-    def _build_column_lookup(self, columns) -> Dict[str, str]:
-        lookup = {}
-        for column in columns:
-            normalized = column.strip().lower()
-            lookup[normalized] = column
-        return lookup
-
-    def _validate_columns(self, lookup) -> None:
-        missing = [label for label in REQUIRED_COLUMNS if label not in lookup]
-        if missing:
-            raise ValueError(
-                "CSV is missing required columns: " + ", ".join(REQUIRED_COLUMNS[key] for key in missing)
-            )
-
-    def _build_summary(self, df: pd.DataFrame, lookup: Dict[str, str]) -> Dict[str, float]:
-        type_column = lookup["type"]
-        summary = {
-            "total_equipment": int(len(df)),
-            "avg_flowrate": round(df[lookup["flowrate"]].mean(), 2),
-            "avg_pressure": round(df[lookup["pressure"]].mean(), 2),
-            "avg_temperature": round(df[lookup["temperature"]].mean(), 2),
-            "type_distribution": df[type_column].value_counts().to_dict(),
-        }
-        return summary
-
-    def _prune_history(self) -> None:
-        ids_to_keep = list(
-            EquipmentDataset.objects.order_by("-uploaded_at").values_list("id", flat=True)[:5]
-        )
-        EquipmentDataset.objects.exclude(id__in=ids_to_keep).delete()
-
 
-class LatestDatasetView(APIView):
+class LatestDatasetView(DatasetPayloadMixin, APIView):
     def get(self, request, *args, **kwargs):
         dataset = EquipmentDataset.objects.order_by("-uploaded_at").first()
         if not dataset:
@@ -126,15 +263,65 @@ class LatestDatasetView(APIView):
                 {"detail": "No datasets uploaded yet."},
                 status=status.HTTP_404_NOT_FOUND,
             )
-        serializer = EquipmentDatasetDetailSerializer(dataset)
-        return Response(serializer.data)
+        return dataset_detail_response(request, dataset)
+
+
+class DatasetDetailView(DatasetPayloadMixin, APIView):
+    def get(self, request, pk, *args, **kwargs):
+        dataset = get_object_or_404(EquipmentDataset, pk=pk)
+        return dataset_detail_response(request, dataset)
+
+
+class DatasetRecordsView(DatasetPayloadMixin, APIView):
+    """
+    A window of a dataset's rows (``?offset=`` / ``?limit=``, at most
+    ``max_limit`` rows) without the dataset metadata.
+
+    The body stays a bare list, column set or Arrow stream in every format,
+    so paging goes in headers: ``X-Total-Count`` has the dataset's row count,
+    and ``Link: <...>; rel="next"`` is sent while rows remain after the
+    window. Every format builds the window in memory, so big datasets should
+    be read in ``limit``-sized pages.
+    """
+
+    max_limit = 100000
+
+    def get(self, request, pk, *args, **kwargs):
+        dataset = get_object_or_404(EquipmentDataset, pk=pk)
+        try:
+            offset = max(int(request.query_params.get("offset", 0)), 0)
+            limit = min(int(request.query_params.get("limit", self.max_limit)), self.max_limit)
+        except ValueError:
+            return Response(
+                {"detail": "offset and limit must be integers."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        limit = max(limit, 0)
+        columns = dataset_columns(dataset, offset=offset, limit=limit)
+        output_format = request.accepted_renderer.format
+        if output_format == "arrow":
+            response = Response({"dataset": None, "columns": columns})
+        elif output_format == "columnar":
+            response = Response(columnar_payload(columns))
+        else:
+            response = Response(columns_to_rows(columns))
+
+        total = dataset.summary.get("total_equipment", 0)
+        response["X-Total-Count"] = str(total)
+        if limit and offset + limit < total:
+            url = request.build_absolute_uri()
+            url = replace_query_param(url, "offset", offset + limit)
+            url = replace_query_param(url, "limit", limit)
+            response["Link"] = f'<{url}>; rel="next"'
+        return response
 
 
 class DatasetHistoryView(generics.ListAPIView):
     serializer_class = EquipmentDatasetSerializer
 
     def get_queryset(self):
-        return EquipmentDataset.objects.order_by("-uploaded_at")[:5]
+        return EquipmentDataset.objects.order_by("-uploaded_at")[: settings.EQUIPMENT_HISTORY_LIMIT]
 
 
 class DatasetPDFView(APIView):
@@ -144,3 +331,193 @@ class DatasetPDFView(APIView):
         response = HttpResponse(pdf_buffer.getvalue(), content_type="application/pdf")
         response["Content-Disposition"] = f'attachment; filename="{pdf_filename(dataset)}"'
         return response
+
+
+class DatasetAnomalyView(generics.ListAPIView):
+    """
+    Readings flagged at ingest, optionally narrowed with ``?metric=`` and
+    ``?type=``.
+    """
+
+    serializer_class = EquipmentAnomalySerializer
+
+    def get_queryset(self):
+        dataset = get_object_or_404(EquipmentDataset, pk=self.kwargs["pk"])
+        queryset = EquipmentAnomaly.objects.filter(dataset=dataset)
+        metric = self.request.query_params.get("metric")
+        if metric:
+            queryset = queryset.filter(metric=metric.lower())
+        equipment_type = self.request.query_params.get("type")
+        if equipment_type:
+            queryset = queryset.filter(equipment_type=equipment_type)
+        return queryset
+
+
+class StreamingAPIView(APIView):
+    """
+    Base for views whose success path returns a non-JSON streaming body;
+    negotiation always settles on JSON so error responses still render.
+    """
+
+    def perform_content_negotiation(self, request, force=False):
+        renderer = FastJSONRenderer()
+        return renderer, renderer.media_type
+
+
+class DatasetExportView(StreamingAPIView):
+    """
+    Stream a dataset's rows as CSV, Parquet or NDJSON.
+
+    ``?columns=`` projects a comma separated list of headers and ``?type=``
+    (repeatable or comma separated) keeps only matching equipment types.
+    ``format`` picks the export encoding here, not a DRF renderer.
+    """
+
+    def get(self, request, pk, *args, **kwargs):
+        dataset = get_object_or_404(EquipmentDataset, pk=pk)
+        export_format = request.query_params.get("format", "csv").lower()
+        if export_format not in EXPORT_FORMATS:
+            return Response(
+                {"detail": "format must be one of: " + ", ".join(EXPORT_FORMATS)},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if export_format == "parquet" and not parquet_available():
+            return Response(
+                {"detail": "Parquet export requires pyarrow on the server."},
+                status=status.HTTP_406_NOT_ACCEPTABLE,
+            )
+
+        requested = _split_param(request.query_params.getlist("columns"))
+        try:
+            pairs = resolve_columns(dataset, requested)
+        except ValueError as exc:
+            return Response({"detail": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        headers = [header for header, _ in pairs]
+        fields = [field for _, field in pairs]
+
+        chunk_size = settings.EQUIPMENT_EXPORT_CHUNK_ROWS
+        rows = export_rows(
+            dataset, pairs, _split_param(request.query_params.getlist("type")), chunk_size
+        )
+        if export_format == "csv":
+            content = iter_csv(headers, rows, chunk_size)
+        elif export_format == "ndjson":
+            content = iter_ndjson(headers, rows, chunk_size)
+        else:
+            content = iter_parquet(headers, fields, rows, chunk_size, dataset.integer_columns)
+
+        content_type, extension = EXPORT_FORMATS[export_format]
+        response = StreamingHttpResponse(content, content_type=content_type)
+        stem = slugify(dataset.file_name.rsplit(".", 1)[0]) or "dataset"
+        response["Content-Disposition"] = f'attachment; filename="{stem}.{extension}"'
+        return response
+
+
+class EquipmentSearchView(APIView):
+    """
+    Look up a piece of equipment across all retained uploads.
+
+    ``?name=`` and ``?type=`` match by substring (or prefix with
+    ``?match=prefix``); results are grouped per equipment with one reading per
+    upload.
+    """
+
+    max_limit = 1000
+
+    def get(self, request, *args, **kwargs):
+        name = request.query_params.get("name", "").strip()
+        equipment_type = request.query_params.get("type", "").strip()
+        mode = request.query_params.get("match", "substring")
+        if not name and not equipment_type:
+            return Response(
+                {"detail": "Provide a 'name' and/or 'type' to search for."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if mode not in MATCH_MODES:
+            return Response(
+                {"detail": "match must be one of: " + ", ".join(MATCH_MODES)},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        try:
+            limit = min(int(request.query_params.get("limit", 500)), self.max_limit)
+        except ValueError:
+            return Response(
+                {"detail": "limit must be an integer."}, status=status.HTTP_400_BAD_REQUEST
+            )
+        # SQLite reads a negative LIMIT as "no limit"; slicing rejects it.
+        limit = max(limit, 0)
+
+        results = {}
+        for record in search_records(name or None, equipment_type or None, mode, limit):
+            entry = results.setdefault(
+                (record.equipment_name, record.equipment_type),
+                {
+                    "equipment_name": record.equipment_name,
+                    "equipment_type": record.equipment_type,
+                    "readings": [],
+                },
+            )
+            entry["readings"].append(EquipmentReadingSerializer(record).data)
+        return Response(list(results.values()))
+
+
+class ChangeFeedView(APIView):
+    """
+    Events after ``?since=<cursor>``; without ``since`` only the current
+    cursor is returned so clients can start following from now.
+    """
+
+    page_size = 500
+
+    def get(self, request, *args, **kwargs):
+        since = request.query_params.get("since")
+        if since is None:
+            return Response({"cursor": current_cursor(), "events": [], "has_more": False})
+        try:
+            cursor = int(since)
+        except ValueError:
+            return Response(
+                {"detail": "since must be an integer cursor."}, status=status.HTTP_400_BAD_REQUEST
+            )
+        events = events_since(cursor, self.page_size + 1)
+        has_more = len(events) > self.page_size
+        events = events[: self.page_size]
+        return Response(
+            {
+                "cursor": events[-1].pk if events else cursor,
+                "events": DatasetEventSerializer(events, many=True).data,
+                "has_more": has_more,
+            }
+        )
+
+
+class ChangeStreamView(StreamingAPIView):
+    """
+    Server-sent events for the change feed, resuming from ``Last-Event-ID``
+    or ``?since=`` (default: now). Answers 503 once this process already
+    holds ``EQUIPMENT_EVENT_MAX_STREAMS`` streams; clients retry shortly.
+    """
+
+    def get(self, request, *args, **kwargs):
+        since = request.headers.get("Last-Event-ID") or request.query_params.get("since")
+        try:
+            cursor = int(since) if since else current_cursor()
+        except ValueError:
+            return Response(
+                {"detail": "since must be an integer cursor."}, status=status.HTTP_400_BAD_REQUEST
+            )
+        stream = EventStream.open(cursor)
+        if stream is None:
+            return Response(
+                {"detail": "Too many open change streams; retry later."},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+                headers={"Retry-After": str(math.ceil(settings.EQUIPMENT_EVENT_POLL_SECONDS * 2))},
+            )
+        response = StreamingHttpResponse(stream, content_type="text/event-stream")
+        response["Cache-Control"] = "no-cache"
+        response["X-Accel-Buffering"] = "no"
+        return response
+
+
+def _split_param(values):
+    return [item.strip() for value in values for item in value.split(",") if item.strip()]
@@ -1,8 +1,13 @@
+import gzip
+import json
+import shutil
 import sys
+import tempfile
+from contextlib import contextmanager
 from pathlib import Path
 
 import requests
-from PyQt5.QtCore import Qt
+from PyQt5.QtCore import Qt, QThread, pyqtSignal
 from PyQt5.QtWidgets import (
     QApplication,
     QFileDialog,
@@ -23,8 +28,126 @@ from PyQt5.QtWidgets import (
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
 from matplotlib.figure import Figure
 
+try:
+    import pyarrow as pa
+except ImportError:  # Arrow is optional; columnar JSON needs nothing extra.
+    pa = None
+
 DEFAULT_API = "http://127.0.0.1:8000/api"
 MAX_TABLE_ROWS = 500
+COLUMNAR_MEDIA_TYPE = "application/vnd.equipment.columnar+json"
+ARROW_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+# Servers without pyarrow fall back to columnar JSON; the server lists its
+# Arrow renderer first, since DRF ignores the q-value here.
+DATASET_ACCEPT = (
+    f"{ARROW_MEDIA_TYPE}, {COLUMNAR_MEDIA_TYPE};q=0.9" if pa is not None else COLUMNAR_MEDIA_TYPE
+)
+
+
+def decode_dataset(response):
+    """
+    Turn a dataset payload (Arrow IPC or columnar JSON) into the dataset dict
+    with ``data`` as ``{"columns": [...], "values": {header: [...]}}``.
+    """
+
+    content_type = response.headers.get("Content-Type", "")
+    if content_type.startswith(ARROW_MEDIA_TYPE):
+        table = pa.ipc.open_stream(response.content).read_all()
+        dataset = json.loads(table.schema.metadata[b"equipment.dataset"])
+        dataset["data"] = {
+            "columns": table.column_names,
+            "values": {name: table.column(name).to_pylist() for name in table.column_names},
+        }
+        return dataset
+
+    dataset = response.json()
+    data = dataset.get("data") or {"columns": [], "values": {}}
+    values = {}
+    for header in data["columns"]:
+        column = data["values"][header]
+        if isinstance(column, dict):
+            dictionary = column["dictionary"]
+            column = [dictionary[index] for index in column["indices"]]
+        values[header] = column
+    dataset["data"] = {"columns": data["columns"], "values": values}
+    return dataset
+
+
+COMPRESSED_SUFFIXES = (".gz", ".zst", ".zip")
+
+
+@contextmanager
+def open_upload(path):
+    """
+    Yield ``(name, file)`` for an upload. Plain CSVs are gzipped into a
+    temporary file first (exports shrink ~10x); already compressed files
+    are sent as they are.
+    """
+
+    if path.suffix.lower() in COMPRESSED_SUFFIXES:
+        with open(path, "rb") as upload_file:
+            yield path.name, upload_file
+        return
+    with tempfile.TemporaryFile() as compressed, open(path, "rb") as csv_file:
+        with gzip.GzipFile(fileobj=compressed, mode="wb", compresslevel=6) as writer:
+            shutil.copyfileobj(csv_file, writer)
+        compressed.seek(0)
+        yield f"{path.name}.gz", compressed
+
+
+class ChangeFeedWorker(QThread):
+    """
+    Follows the server-sent change feed and re-emits each event on the GUI
+    thread, reconnecting from the last seen cursor when the stream ends.
+    """
+
+    event_received = pyqtSignal(dict)
+
+    def __init__(self, base_url, token, cursor):
+        super().__init__()
+        self.base_url = base_url
+        self.token = token
+        self.cursor = cursor
+        self._running = True
+        self._response = None
+
+    def stop(self):
+        self._running = False
+        if self._response is not None:
+            # Unblocks the pending read so the thread can finish promptly.
+            self._response.close()
+
+    def run(self):
+        while self._running:
+            try:
+                self._follow()
+            except (requests.RequestException, OSError, ValueError, AttributeError):
+                pass
+            if self._running:
+                self.msleep(2000)
+
+    def _follow(self):
+        headers = {
+            "Authorization": f"Token {self.token}",
+            "Accept": "text/event-stream",
+            "Last-Event-ID": str(self.cursor),
+        }
+        with requests.get(
+            f"{self.base_url}/changes/stream/", headers=headers, stream=True, timeout=(10, 60)
+        ) as response:
+            self._response = response
+            response.raise_for_status()
+            data = []
+            for line in response.iter_lines(decode_unicode=True):
+                if not self._running:
+                    return
+                if line.startswith("data:"):
+                    data.append(line[5:].strip())
+                elif not line and data:
+                    event = json.loads("\n".join(data))
+                    data = []
+                    self.cursor = event["id"]
+                    self.event_received.emit(event)
 
 
 class EquipmentVisualizer(QMainWindow):
@@ -35,6 +158,8 @@ class EquipmentVisualizer(QMainWindow):
 
         self.latest_dataset = None
         self.history = []
+        self.token = None
+        self.feed_worker = None
 
         container = QWidget()
         layout = QVBoxLayout()
@@ -66,7 +191,7 @@ class EquipmentVisualizer(QMainWindow):
         layout.addWidget(self.password_input, 2, 1)
 
         self.connect_button = QPushButton("Connect")
-        self.connect_button.clicked.connect(self.load_data)
+        self.connect_button.clicked.connect(self.connect_to_backend)
         layout.addWidget(self.connect_button, 0, 2, 3, 1)
 
         self.status_label = QLabel("Waiting to connect...")
@@ -140,20 +265,99 @@ class EquipmentVisualizer(QMainWindow):
         self.table.setAlternatingRowColors(True)
         return self.table
 
-    def _auth(self):
-        return self.username_input.text().strip(), self.password_input.text().strip()
+    def _credentials(self):
+        return {
+            "username": self.username_input.text().strip(),
+            "password": self.password_input.text().strip(),
+        }
 
     def _base_url(self):
         return self.api_input.text().rstrip("/")
 
-    def _request(self, method, path, **kwargs):
+    def _login(self):
+        # Exchange the credentials once for a token; the password is not sent again.
+        response = requests.post(
+            f"{self._base_url()}/auth/token/", json=self._credentials(), timeout=60
+        )
+        response.raise_for_status()
+        self.token = response.json()["token"]
+
+    def _request(self, method, path, accept=None, **kwargs):
         url = f"{self._base_url()}/{path.lstrip('/')}"
-        response = requests.request(method, url, auth=self._auth(), timeout=60, **kwargs)
+        if self.token is None:
+            self._login()
+        headers = {"Authorization": f"Token {self.token}"}
+        if accept:
+            headers["Accept"] = accept
+        response = requests.request(method, url, headers=headers, timeout=60, **kwargs)
+        if response.status_code == 401 and "files" not in kwargs:
+            # Token was revoked; upload bodies are already consumed so those just fail.
+            self._login()
+            headers["Authorization"] = f"Token {self.token}"
+            response = requests.request(method, url, headers=headers, timeout=60, **kwargs)
         if response.status_code == 404:
             return response
         response.raise_for_status()
         return response
 
+    def connect_to_backend(self):
+        self.token = None
+        self._stop_feed()
+        # Take the cursor before loading so nothing between the two is missed.
+        try:
+            cursor = self._request("GET", "changes/").json()["cursor"]
+        except (requests.RequestException, ValueError, KeyError):
+            cursor = None
+        self.load_data()
+        if cursor is not None:
+            self._start_feed(cursor)
+
+    def _start_feed(self, cursor):
+        self.feed_worker = ChangeFeedWorker(self._base_url(), self.token, cursor)
+        self.feed_worker.event_received.connect(self._apply_change)
+        self.feed_worker.start()
+
+    def _stop_feed(self):
+        if self.feed_worker:
+            self.feed_worker.stop()
+            self.feed_worker.wait(3000)
+            self.feed_worker = None
+
+    def _apply_change(self, event):
+        kind = event.get("kind")
+        if kind == "dataset.created":
+            summary = event.get("payload") or {}
+            if any(item["id"] == summary.get("id") for item in self.history):
+                return
+            # The server decides retention; dataset.pruned events shrink the list.
+            self.history = [summary] + self.history
+            self._populate_history()
+            self._refresh_latest()
+        elif kind == "dataset.pruned":
+            self.history = [item for item in self.history if item["id"] != event.get("dataset_id")]
+            self._populate_history()
+
+    def _refresh_latest(self):
+        try:
+            response = self._request("GET", "datasets/latest/", accept=DATASET_ACCEPT)
+        except requests.RequestException as exc:
+            self.status_label.setText(str(exc))
+            return
+        if response.status_code == 404:
+            return
+        self._show_dataset(decode_dataset(response))
+        self.status_label.setText(f"New upload: {self.latest_dataset.get('file_name')}")
+
+    def _show_dataset(self, dataset):
+        self.latest_dataset = dataset
+        self._update_summary(dataset.get("summary"))
+        self._update_chart(dataset.get("summary", {}).get("type_distribution"))
+        self._populate_table(dataset.get("data"))
+
+    def closeEvent(self, event):
+        self._stop_feed()
+        super().closeEvent(event)
+
     def load_data(self):
         self.status_label.setText("Loading data from backend...")
         QApplication.setOverrideCursor(Qt.WaitCursor)
@@ -162,7 +366,7 @@ class EquipmentVisualizer(QMainWindow):
             self.history = history_response.json()
             self._populate_history()
 
-            latest_response = self._request("GET", "datasets/latest/")
+            latest_response = self._request("GET", "datasets/latest/", accept=DATASET_ACCEPT)
             if latest_response.status_code == 404:
                 self.latest_dataset = None
                 self._clear_summary()
@@ -170,10 +374,7 @@ class EquipmentVisualizer(QMainWindow):
                 self._clear_table()
                 self.status_label.setText("Connected. Upload data to get started.")
             else:
-                self.latest_dataset = latest_response.json()
-                self._update_summary(self.latest_dataset.get("summary"))
-                self._update_chart(self.latest_dataset.get("summary", {}).get("type_distribution"))
-                self._populate_table(self.latest_dataset.get("data", []))
+                self._show_dataset(decode_dataset(latest_response))
                 self.status_label.setText("Latest dataset synced successfully.")
         except requests.HTTPError as exc:
             self.status_label.setText(f"Error: {exc.response.text}")
@@ -185,22 +386,30 @@ class EquipmentVisualizer(QMainWindow):
             QApplication.restoreOverrideCursor()
 
     def upload_csv(self):
-        file_path, _ = QFileDialog.getOpenFileName(self, "Select CSV file", "", "CSV Files (*.csv)")
+        file_path, _ = QFileDialog.getOpenFileName(
+            self, "Select CSV file", "", "CSV Files (*.csv *.csv.gz *.csv.zst *.zip)"
+        )
         if not file_path:
             return
         try:
-            with open(file_path, "rb") as csv_file:
+            with open_upload(Path(file_path)) as (upload_name, upload_file):
                 response = self._request(
                     "POST",
                     "upload/",
-                    files={"file": (Path(file_path).name, csv_file, "text/csv")},
+                    accept=DATASET_ACCEPT,
+                    files={"file": (upload_name, upload_file, "application/octet-stream")},
                 )
             self.status_label.setText(f"Uploaded {Path(file_path).name}")
-            self.latest_dataset = response.json()
-            self._update_summary(self.latest_dataset.get("summary"))
-            self._update_chart(self.latest_dataset.get("summary", {}).get("type_distribution"))
-            self._populate_table(self.latest_dataset.get("data", []))
-            self.load_data()
+            # The upload response already carries the new dataset; only the
+            # history list needs updating (the change feed handles pruning).
+            self._show_dataset(decode_dataset(response))
+            summary = {
+                key: self.latest_dataset[key] for key in ("id", "file_name", "uploaded_at", "summary")
+            }
+            self.history = [summary] + [
+                item for item in self.history if item["id"] != summary["id"]
+            ]
+            self._populate_history()
         except requests.HTTPError as exc:
             QMessageBox.critical(
                 self, "Upload failed", exc.response.json().get("detail", exc.response.text)
@@ -272,23 +481,23 @@ class EquipmentVisualizer(QMainWindow):
         self.figure.clear()
         self.canvas.draw()
 
-    def _populate_table(self, records):
+    def _populate_table(self, data):
         self.table.clear()
-        if not records:
+        if not data or not data["columns"]:
             self.table.setRowCount(0)
             self.table.setColumnCount(0)
             return
 
-        headers = list(records[0].keys())
-        limited_records = records[:MAX_TABLE_ROWS]
+        headers = data["columns"]
+        columns = [data["values"][header][:MAX_TABLE_ROWS] for header in headers]
+        row_count = len(columns[0])
 
         self.table.setColumnCount(len(headers))
-        self.table.setRowCount(len(limited_records))
+        self.table.setRowCount(row_count)
         self.table.setHorizontalHeaderLabels(headers)
 
-        for row_index, row in enumerate(limited_records):
-            for col_index, header in enumerate(headers):
-                value = row.get(header, "")
+        for col_index, column in enumerate(columns):
+            for row_index, value in enumerate(column):
                 item = QTableWidgetItem(str(value))
                 self.table.setItem(row_index, col_index, item)
         self.table.resizeColumnsToContents()
@@ -1,4 +1,4 @@
-import { useMemo, useRef, useState } from 'react'
+import { useEffect, useMemo, useRef, useState } from 'react'
 import axios from 'axios'
 import {
   Chart,
@@ -16,6 +16,65 @@ Chart.register(CategoryScale, LinearScale, BarElement, Tooltip, Legend)
 const API_BASE_URL =
   import.meta.env.VITE_API_BASE_URL || 'http://127.0.0.1:8000/api'
 
+const createClient = (token) =>
+  axios.create({
+    baseURL: API_BASE_URL,
+    headers: { Authorization: `Token ${token}` },
+  })
+
+// Follows the server-sent change feed with fetch (EventSource cannot send the
+// Authorization header), reconnecting from the last seen cursor.
+const followChanges = async (token, startCursor, signal, onEvent) => {
+  let cursor = startCursor
+  while (!signal.aborted) {
+    try {
+      const response = await fetch(
+        `${API_BASE_URL}/changes/stream/?since=${cursor}`,
+        {
+          headers: {
+            Authorization: `Token ${token}`,
+            Accept: 'text/event-stream',
+          },
+          signal,
+        },
+      )
+      if (!response.ok) throw new Error(`Change feed returned ${response.status}`)
+      const reader = response.body.pipeThrough(new TextDecoderStream()).getReader()
+      let buffer = ''
+      for (;;) {
+        const { value, done } = await reader.read()
+        if (done) break
+        buffer += value
+        let boundary = buffer.indexOf('\n\n')
+        while (boundary !== -1) {
+          const data = buffer
+            .slice(0, boundary)
+            .split('\n')
+            .filter((line) => line.startsWith('data:'))
+            .map((line) => line.slice(5).trim())
+            .join('\n')
+          buffer = buffer.slice(boundary + 2)
+          boundary = buffer.indexOf('\n\n')
+          if (!data) continue
+          const event = JSON.parse(data)
+          cursor = event.id
+          onEvent(event)
+        }
+      }
+    } catch {
+      if (signal.aborted) return
+    }
+    await new Promise((resolve) => setTimeout(resolve, 2000))
+  }
+}
+
+const toHistoryEntry = ({ id, file_name, uploaded_at, summary }) => ({
+  id,
+  file_name,
+  uploaded_at,
+  summary,
+})
+
 function App() {
   const [credentials, setCredentials] = useState({
     username: 'demo',
@@ -29,29 +88,36 @@ function App() {
   const [loading, setLoading] = useState(false)
   const [selectedFile, setSelectedFile] = useState(null)
   const [uploading, setUploading] = useState(false)
+  const [token, setToken] = useState(null)
+  const [feedCursor, setFeedCursor] = useState(null)
   const fileInputRef = useRef(null)
+  const historyRef = useRef(history)
+
+  const client = useMemo(() => (token ? createClient(token) : null), [token])
 
-  const client = useMemo(() => {
-    if (!credentials.username || !credentials.password) return null
-    return axios.create({
-      baseURL: API_BASE_URL,
-      auth: {
-        username: credentials.username,
-        password: credentials.password,
-      },
+  const login = async () => {
+    // Trade the credentials for a token once instead of sending them on every call.
+    const { data } = await axios.post(`${API_BASE_URL}/auth/token/`, {
+      username: credentials.username,
+      password: credentials.password,
     })
-  }, [credentials])
+    setToken(data.token)
+    return createClient(data.token)
+  }
 
   const fetchData = async () => {
-    if (!client) {
+    if (!credentials.username || !credentials.password) {
       setAuthError('Please supply username and password first.')
       return
     }
     setLoading(true)
     setAuthError('')
     try {
+      const activeClient = await login()
+      // Take the cursor first so nothing between it and the load is missed.
+      const { data: feed } = await activeClient.get('/changes/')
       const [latestResponse, historyResponse] = await Promise.all([
-        client
+        activeClient
           .get('/datasets/latest/')
           .catch((error) => {
             if (error.response && error.response.status === 404) {
@@ -59,15 +125,21 @@ function App() {
             }
             throw error
           }),
-        client.get('/datasets/history/'),
+        activeClient.get('/datasets/history/'),
       ])
       setLatestDataset(latestResponse.data)
       setHistory(historyResponse.data)
+      setFeedCursor(feed.cursor)
       setIsConnected(true)
       setStatusMessage('Connected to backend successfully.')
     } catch (error) {
       setIsConnected(false)
-      if (error.response && error.response.status === 401) {
+      setToken(null)
+      if (
+        error.response &&
+        (error.response.status === 401 ||
+          (error.response.status === 400 && error.config?.url?.endsWith('/auth/token/')))
+      ) {
         setAuthError('Authentication failed. Double-check your credentials.')
       } else {
         setAuthError(
@@ -93,8 +165,12 @@ function App() {
       const { data } = await client.post('/upload/', formData, {
         headers: { 'Content-Type': 'multipart/form-data' },
       })
+      // The response carries the new dataset; pruning arrives via the change feed.
       setLatestDataset(data)
-      await fetchHistoryOnly()
+      setHistory((previous) => [
+        toHistoryEntry(data),
+        ...previous.filter((item) => item.id !== data.id),
+      ])
       setStatusMessage(`Uploaded ${selectedFile.name} successfully.`)
       setSelectedFile(null)
       if (fileInputRef.current) {
@@ -109,15 +185,37 @@ function App() {
     }
   }
 
-  const fetchHistoryOnly = async () => {
-    if (!client) return
-    try {
-      const historyResponse = await client.get('/datasets/history/')
-      setHistory(historyResponse.data)
-    } catch {
-      setStatusMessage('Unable to refresh history right now.')
+  useEffect(() => {
+    historyRef.current = history
+  }, [history])
+
+  useEffect(() => {
+    if (!token || feedCursor === null) return undefined
+    const controller = new AbortController()
+    const feedClient = createClient(token)
+    const applyChange = async (event) => {
+      if (event.kind === 'dataset.created') {
+        if (historyRef.current.some((item) => item.id === event.dataset_id)) return
+        // The server decides retention; dataset.pruned events shrink the list.
+        setHistory((previous) => [
+          event.payload,
+          ...previous.filter((item) => item.id !== event.dataset_id),
+        ])
+        try {
+          const { data } = await feedClient.get('/datasets/latest/')
+          setLatestDataset(data)
+        } catch {
+          setStatusMessage('Unable to load the newest upload right now.')
+        }
+      } else if (event.kind === 'dataset.pruned') {
+        setHistory((previous) =>
+          previous.filter((item) => item.id !== event.dataset_id),
+        )
+      }
     }
-  }
+    followChanges(token, feedCursor, controller.signal, applyChange)
+    return () => controller.abort()
+  }, [token, feedCursor])
 
   const handleDownloadPdf = async (datasetId) => {
     if (!client) return